@@ -0,0 +1,74 @@
+import gc
+import json
+import multiprocessing
+import os
+
+
+def read_pairs(lines):
+    """
+    Yields (source, target) pairs from tab-separated lines,
+    skipping blank lines and comments. A comment starts with "# " or is a
+    "#" line without a tab, so pairs naming people as "#<id>", such as
+    "#102<tab>#158", are still answered.
+
+    Malformed lines are yielded as a single-element tuple so the
+    answer function can report them in order.
+    """
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line.strip() or is_comment(line):
+            continue
+        fields = line.split("\t")
+        if len(fields) == 2:
+            yield (fields[0].strip(), fields[1].strip())
+        else:
+            yield (line,)
+
+
+def is_comment(line):
+    """
+    Returns whether a batch line is a comment rather than a pair.
+    """
+    return line.startswith("# ") or (line.startswith("#") and "\t" not in line)
+
+
+def run_batch(pairs, answer, output, workers=None, chunksize=16):
+    """
+    Answers every pair with `answer` and streams one JSON object
+    per line to `output`, in input order.
+
+    With more than one worker the pairs are fanned out to a pool of
+    forked processes, which share the already loaded graph copy-on-write.
+    `answer` must be a module-level function so it can be sent to them.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for pair in pairs:
+            write_result(output, answer(pair))
+        return
+
+    with fork_context().Pool(workers) as pool:
+        for result in pool.imap(answer, pairs, chunksize):
+            write_result(output, result)
+
+
+def fork_context():
+    """
+    Returns the multiprocessing context that forks workers from this
+    process, so they share its already loaded data copy-on-write.
+    """
+    # Objects that survive until the fork are never collected again, so the
+    # collector does not touch (and copy) their pages in every worker.
+    # Collecting first keeps garbage from being frozen along with them when
+    # a long-running server forks again after every update.
+    gc.collect()
+    gc.freeze()
+    return multiprocessing.get_context("fork")
+
+
+def write_result(output, result):
+    """
+    Writes one result as a JSON line and flushes it so consumers see it immediately.
+    """
+    output.write(json.dumps(result) + "\n")
+    output.flush()
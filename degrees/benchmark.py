@@ -0,0 +1,236 @@
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import degrees
+from landmarks import UNREACHABLE, breadth_first_distances
+from server import percentile
+
+FIRST_NAMES = [
+    "Tom", "Anna", "Kevin", "Maria", "John", "Li", "Sam", "Eva", "Emma", "Carlos",
+    "Priya", "Yuki", "Omar", "Sofia", "James", "Chen", "Fatima", "Lucas", "Ingrid", "Kofi"
+]
+LAST_NAMES = [
+    "Hanks", "Smith", "Bacon", "Lee", "Brown", "Garcia", "Kim", "Novak", "Stone", "Rossi",
+    "Khan", "Tanaka", "Silva", "Müller", "Dubois", "Okafor", "Ivanova", "Nakamura", "Cohen", "Park"
+]
+
+# Share of people cast only in small movies of their own, so that some
+# pairs are unreachable as in the real data
+ISOLATED_FRACTION = 0.01
+
+# Movies list their top-billed stars, most often four of them
+CAST_SIZES = (1, 2, 3, 4, 4, 4, 4, 5, 6)
+
+QUERY_KINDS = ("short", "long", "unreachable")
+
+
+def generate(directory, people=100000, movies=50000, seed=0, exponent=0.8):
+    """
+    Writes a synthetic people.csv, movies.csv and stars.csv to `directory`.
+
+    Casting follows a power law: the person of popularity rank r is picked
+    with weight 1 / (r + 1) ** exponent, so a few people star in very many
+    movies and most in one or two. The same arguments always write the
+    same files.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    isolated = int(people * ISOLATED_FRACTION)
+    connected = people - isolated
+
+    with open(os.path.join(directory, "people.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for person in range(people):
+            birth = "" if rng.random() < 0.3 else str(rng.randint(1900, 2010))
+            writer.writerow([person + 1, f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", birth])
+
+    # Island movies of two or three isolated people come after the others
+    islands = [list(range(start, min(start + 3, people))) for start in range(connected, people, 3)]
+    with open(os.path.join(directory, "movies.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for movie in range(movies + len(islands)):
+            year = "" if rng.random() < 0.02 else str(rng.randint(1920, 2024))
+            writer.writerow([100000 + movie, f"Movie {movie}", year])
+
+    # Popularity is shuffled so it does not follow the ids
+    popularity = list(range(connected))
+    rng.shuffle(popularity)
+    weights = list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(connected)))
+    with open(os.path.join(directory, "stars.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        for movie in range(movies):
+            cast = rng.choices(popularity, cum_weights=weights, k=rng.choice(CAST_SIZES))
+            for person in sorted(set(cast)):
+                writer.writerow([person + 1, 100000 + movie])
+        for island, cast in enumerate(islands):
+            for person in cast:
+                writer.writerow([person + 1, 100000 + movies + island])
+
+
+def peak_rss():
+    """
+    Returns the peak resident set size of this process in bytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def measure_load(directory, use_snapshot):
+    """
+    Loads the dataset and returns the seconds it took and the peak RSS.
+    Meant to run in a fresh process so the numbers are not shared.
+    """
+    started = time.perf_counter()
+    degrees.load_data(directory, use_snapshot)
+    return {"seconds": time.perf_counter() - started, "peak_rss": peak_rss()}
+
+
+def in_fresh_process(function, *args):
+    """
+    Runs `function(*args)` in a newly started interpreter and returns its result.
+    """
+    with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(function, *args).result()
+
+
+def pick_pairs(count, rng):
+    """
+    Returns `count` pairs of person indexes of each kind for the loaded
+    data: "short" pairs one or two degrees apart, "long" pairs as far
+    apart as their source gets (at least three degrees), and
+    "unreachable" pairs. Kinds the data has too few of get fewer pairs.
+    """
+    graph = degrees.graph
+    person_count = len(graph.person_ids)
+    pairs = {kind: [] for kind in QUERY_KINDS}
+    # Every breadth-first search contributes a few pairs of each kind
+    per_source = max(1, count // 10)
+    for _ in range(3 * (count // per_source + 1)):
+        if all(len(found) >= count for found in pairs.values()):
+            break
+        source = rng.randrange(person_count)
+        distances = breadth_first_distances(graph, source)
+        farthest = max(distance for distance in distances if distance != UNREACHABLE)
+        candidates = {kind: [] for kind in QUERY_KINDS}
+        for person, distance in enumerate(distances):
+            if distance in (1, 2):
+                candidates["short"].append(person)
+            elif distance == farthest and distance >= 3:
+                candidates["long"].append(person)
+            elif distance == UNREACHABLE:
+                candidates["unreachable"].append(person)
+        for kind, people in candidates.items():
+            wanted = min(per_source, count - len(pairs[kind]), len(people))
+            pairs[kind].extend((source, target) for target in rng.sample(people, wanted))
+    return pairs
+
+
+def time_queries(pairs):
+    """
+    Times shortest_path on each pair and returns latency statistics in
+    milliseconds.
+    """
+    person_ids = degrees.graph.person_ids
+    latencies = []
+    for source, target in pairs:
+        started = time.perf_counter()
+        degrees.shortest_path(person_ids[source], person_ids[target])
+        latencies.append((time.perf_counter() - started) * 1000)
+    latencies.sort()
+    return {
+        "count": len(latencies),
+        "mean_ms": sum(latencies) / len(latencies) if latencies else 0.0,
+        "p50_ms": percentile(latencies, 0.50),
+        "p90_ms": percentile(latencies, 0.90),
+        "p99_ms": percentile(latencies, 0.99),
+        "max_ms": latencies[-1] if latencies else 0.0
+    }
+
+
+def commit():
+    """
+    Returns the git commit being benchmarked, or None outside a checkout.
+    """
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def run(directory, queries=200, seed=0):
+    """
+    Benchmarks loading `directory` from CSV and from its snapshot, each in
+    a fresh process, then query latency for short, long and unreachable
+    pairs. Returns the results as a JSON-serializable dictionary.
+    """
+    load = {"csv": in_fresh_process(measure_load, directory, False)}
+    # The first snapshot load writes the snapshot if it is missing or stale
+    in_fresh_process(measure_load, directory, True)
+    load["snapshot"] = in_fresh_process(measure_load, directory, True)
+
+    degrees.load_data(directory)
+    graph = degrees.graph
+    pairs = pick_pairs(queries, random.Random(seed))
+    return {
+        "commit": commit(),
+        "python": platform.python_version(),
+        "dataset": {
+            "directory": os.path.abspath(directory),
+            "people": len(graph.person_ids),
+            "movies": len(graph.movie_ids),
+            "stars": len(graph.person_movies)
+        },
+        "load": load,
+        "queries": {kind: time_queries(pairs[kind]) for kind in QUERY_KINDS},
+        "peak_rss": peak_rss()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark degrees on real or synthetic data.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    generator = commands.add_parser("generate", help="write a synthetic dataset")
+    generator.add_argument("directory")
+    generator.add_argument("--people", type=int, default=100000)
+    generator.add_argument("--movies", type=int, default=50000)
+    generator.add_argument("--seed", type=int, default=0)
+    generator.add_argument("--exponent", type=float, default=0.8,
+                           help="power-law exponent of casting popularity (default: 0.8)")
+    runner = commands.add_parser("run", help="benchmark a dataset and print the results as JSON")
+    runner.add_argument("directory")
+    runner.add_argument("--queries", type=int, default=200, help="pairs of each kind to time")
+    runner.add_argument("--seed", type=int, default=0)
+    runner.add_argument("--output", metavar="FILE", help="write the JSON here instead of stdout")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        generate(args.directory, args.people, args.movies, args.seed, args.exponent)
+        return
+
+    results = json.dumps(run(args.directory, args.queries, args.seed), indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(results + "\n")
+    else:
+        print(results)
+
+
+if __name__ == "__main__":
+    main()
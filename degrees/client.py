@@ -0,0 +1,74 @@
+import argparse
+import json
+import socket
+import sys
+
+from degrees import year_range
+
+
+def request(message, host="127.0.0.1", port=8765, path=None):
+    """
+    Sends one request dictionary to a degrees server and returns its response.
+    """
+    if path is not None:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(path)
+    else:
+        connection = socket.create_connection((host, port))
+    with connection, connection.makefile("rwb") as stream:
+        stream.write(json.dumps(message).encode("utf-8") + b"\n")
+        stream.flush()
+        return json.loads(stream.readline())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query a running `degrees.py --serve` server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", metavar="PATH", help="connect to a Unix socket instead of TCP")
+    commands = parser.add_subparsers(dest="op", required=True)
+    path = commands.add_parser("path", help="shortest path between two people")
+    path.add_argument("source")
+    path.add_argument("target")
+    path.add_argument("--years", type=year_range, metavar="START-END",
+                      help="only use movies released in these years")
+    alternatives = commands.add_parser("paths", help="several shortest paths or alternatives between two people")
+    alternatives.add_argument("source")
+    alternatives.add_argument("target")
+    alternatives.add_argument("--limit", type=int, default=10)
+    alternatives.add_argument("--years", type=year_range, metavar="START-END",
+                              help="only use movies released in these years")
+    alternatives.add_argument("--alternatives", action="store_true",
+                              help="include longer loopless paths, shortest first")
+    bounds = commands.add_parser("bounds", help="landmark bounds on the degrees between two people")
+    bounds.add_argument("source")
+    bounds.add_argument("target")
+    resolve = commands.add_parser("resolve", help="look up the IMDB ids for a name")
+    resolve.add_argument("name")
+    commands.add_parser("stats", help="request counters")
+    args = parser.parse_args()
+
+    message = {"op": args.op}
+    if args.op in ("path", "paths", "bounds"):
+        message["source"] = args.source
+        message["target"] = args.target
+    if args.op in ("path", "paths"):
+        if args.years is not None:
+            message["years"] = list(args.years)
+    if args.op == "paths":
+        message["limit"] = args.limit
+        message["alternatives"] = args.alternatives
+    elif args.op == "resolve":
+        message["name"] = args.name
+
+    try:
+        response = request(message, args.host, args.port, args.socket)
+    except OSError as error:
+        sys.exit(f"Could not reach the server: {error}")
+    print(json.dumps(response, indent=2))
+    if "error" in response:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
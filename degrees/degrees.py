@@ -1,13 +1,30 @@
 #Solution Code to CS50 Ai course Degree's problem by Alberto Pascal Garza
 #albertopascalgarza@gmail.com
 
+import argparse
 import csv
+import functools
+import itertools
+import json
+import math
+import os
 import sys
 import copy
 
-from util import Node, StackFrontier, QueueFrontier
+from batch import read_pairs, run_batch
+from graph import Graph, PeopleView, MoviesView
+from landmarks import DEFAULT_LANDMARKS, LANDMARKS_FILE, LandmarkIndex
+from name_index import NameIndex, NamesView
+import paths
+from search import Searcher
+from server import QueryServer
+from snapshot import load_snapshot, save_snapshot, source_stamp
+from tail import CsvTail
 
-# Maps names to a set of corresponding person_ids
+# Normalized, prefix and typo-tolerant lookups of people by name, built by load_data
+name_index = None
+
+# Maps lowercased names to a set of corresponding person_ids
 names = {}
 
 # Maps person_ids to a dictionary of: name, birth, movies (a set of movie_ids)
@@ -16,64 +33,308 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact integer graph backing `people` and `movies`, built by load_data
+graph = None
+
+# Reusable search buffers for `graph`, created by load_data
+searcher = None
+
+# Optional landmark distance index, built by build_landmarks
+landmarks = None
+
+# How many landmarks build_landmarks was asked for, to rebuild after updates
+landmark_count = 0
+
+# Follows rows appended to the loaded CSV files, created by load_data
+updates = None
+
+# Star rows waiting for their person or movie to be added
+pending_stars = []
+
+# Most star rows kept waiting; beyond it the oldest are dropped and reported
+MAX_PENDING_STARS = 100000
+
+# Fewest seconds between landmark index rebuilds while following updates
+LANDMARK_REBUILD_INTERVAL = 60.0
+
+# Most loopless alternatives a "paths" request may ask for, as each one
+# costs a breadth-first search per person on the previous path
+MAX_ALTERNATIVES = 50
+
+# Appended rows, as a fraction of the snapshot's edges, beyond which
+# load_data reparses the CSV files instead of applying them incrementally
+REBUILD_FRACTION = 0.05
+
 
-def load_data(directory):
+def load_data(directory, use_snapshot=True):
     """
     Load data from CSV files into memory.
+
+    People and movies are interned into a compact Graph; `people`,
+    `movies` and `names` become read-only views over it. Unless
+    `use_snapshot` is False, the parsed graph is saved as a binary
+    snapshot the first time and memory-mapped on later runs. Rows appended to the CSV files since
+    the snapshot was written are applied on top of it, unless there are
+    so many that a full reload is cheaper. Any landmark index is dropped,
+    as its distances are indexed by the previous graph's people.
+    """
+    global landmark_count
+    landmark_count = 0
+    loaded = None
+    tail = None
+    appended = {}
+    if use_snapshot:
+        loaded = load_snapshot(directory)
+    if loaded is not None:
+        tail = CsvTail(directory, loaded.source_sizes)
+        appended = tail.poll()
+        if appended is None or sum(len(rows) for rows in appended.values()) > REBUILD_FRACTION * len(loaded.person_movies):
+            loaded = None
+            appended = {}
+    if loaded is None:
+        stamp = source_stamp(directory)
+        loaded = parse_directory(directory, stamp)
+        tail = CsvTail(directory, loaded.source_sizes)
+        if use_snapshot:
+            try:
+                save_snapshot(loaded, directory, stamp)
+            except OSError:
+                #A read-only dataset directory just means no cache
+                pass
+
+    use_graph(loaded, tail)
+    if appended:
+        apply_updates(appended["people.csv"], appended["movies.csv"], appended["stars.csv"])
+
+
+def parse_directory(directory, stamp):
+    """
+    Parses the CSV files of `directory`, whose source_stamp was `stamp`
+    just before, into a new Graph that records the sizes it covers.
+    """
+    parsed = read_csv_files(directory)
+    parsed.source_sizes = {filename: stamp[filename][0] for filename in stamp}
+    return parsed
+
+
+def use_graph(loaded, tail):
+    """
+    Makes `loaded` the data every query uses, with new views, name index
+    and search buffers over it, and `tail` following its CSV files.
+    Waiting star rows and the landmark index belong to the previous graph,
+    so they are dropped. Returns True, as the data changed.
+    """
+    global graph, people, movies, names, searcher, name_index, updates, pending_stars, landmarks
+    graph = loaded
+    updates = tail
+    pending_stars = []
+    landmarks = None
+    name_index = NameIndex(graph)
+    names = NamesView(name_index)
+    people = PeopleView(graph)
+    movies = MoviesView(graph)
+    searcher = Searcher(graph)
+    return True
+
+
+def apply_updates(people_rows=(), movie_rows=(), star_rows=()):
+    """
+    Applies people.csv, movies.csv and stars.csv rows (dictionaries keyed
+    by the CSV headers) to the loaded data and its name index and
+    components, in time proportional to the number of rows.
+
+    Rows for ids that are already known, and rows with missing or extra
+    fields, are ignored. Star rows naming a
+    person or movie that is not known yet are kept and retried on every
+    later call until both are added, so the rows of a CSV file appended
+    late still apply; past MAX_PENDING_STARS waiting rows the oldest are
+    dropped with a warning. New people or stars drop the landmark index
+    until `rebuild_landmarks` or `build_landmarks` rebuilds it. Returns how
+    many people, movies and stars were added.
+    """
+    global landmarks, pending_stars
+    added = {"people": 0, "movies": 0, "stars": 0}
+    for row in filter(complete_row, people_rows):
+        person = graph.apply_person(row["id"], row["name"], row["birth"])
+        if person is not None:
+            name_index.add(person)
+            added["people"] += 1
+    for row in filter(complete_row, movie_rows):
+        if graph.apply_movie(row["id"], row["title"], row["year"]) is not None:
+            added["movies"] += 1
+
+    waiting = []
+    for row in itertools.chain(pending_stars, filter(complete_row, star_rows)):
+        person = graph.person_index.get(row["person_id"])
+        movie = graph.movie_index.get(row["movie_id"])
+        if person is None or movie is None:
+            waiting.append(row)
+        elif graph.apply_star(person, movie):
+            name_index.starred(person)
+            added["stars"] += 1
+    if len(waiting) > MAX_PENDING_STARS:
+        dropped = len(waiting) - MAX_PENDING_STARS
+        print(f"Dropping {dropped} stars.csv rows whose person or movie never appeared, "
+              f"such as {waiting[0]['person_id']} in {waiting[0]['movie_id']}", file=sys.stderr)
+        waiting = waiting[dropped:]
+    pending_stars = waiting
+
+    searcher.grow()
+    if (added["people"] or added["stars"]) and landmarks is not None:
+        #New edges can shorten distances, which breaks the landmark lower bounds,
+        #and new people have no distances; rebuild_landmarks rebuilds the index
+        landmarks = None
+    return added
+
+
+def complete_row(row):
+    """
+    Returns whether a CSV row has exactly the fields of its header, unlike
+    a short line, whose missing fields csv.DictReader fills with None.
+    """
+    return None not in row and None not in row.values()
+
+
+def read_updates():
+    """
+    Reads the rows appended to the loaded CSV files since they were loaded
+    or last read, without changing the loaded data, so it can run on
+    another thread. Returns a function that applies them and returns
+    whether anything changed, or None if nothing was appended.
+
+    If a file was truncated or rewritten instead of appended to, all of
+    them are parsed again and the function replaces the loaded data.
+    """
+    appended = updates.poll()
+    if appended is None:
+        directory = updates.directory
+        print(f"The CSV files in {directory} were rewritten; reloading them...", file=sys.stderr)
+        stamp = source_stamp(directory)
+        reloaded = parse_directory(directory, stamp)
+        return functools.partial(use_graph, reloaded, CsvTail(directory, reloaded.source_sizes))
+    if not any(appended.values()):
+        return None
+    return functools.partial(apply_appended, appended)
+
+
+def apply_appended(appended):
     """
+    Applies rows read by `read_updates`, returning whether anything changed.
+    """
+    return any(apply_updates(appended["people.csv"], appended["movies.csv"], appended["stars.csv"]).values())
+
+
+def read_csv_files(directory):
+    """
+    Parses people.csv, movies.csv and stars.csv into a new Graph.
+    """
+    graph = Graph()
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
-            people[row["id"]] = {
-                "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
-            }
-            if row["name"].lower() not in names:
-                names[row["name"].lower()] = {row["id"]}
-            else:
-                names[row["name"].lower()].add(row["id"])
+            graph.add_person(row["id"], row["name"], row["birth"])
 
     # Load movies
     with open(f"{directory}/movies.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
-            movies[row["id"]] = {
-                "title": row["title"],
-                "year": row["year"],
-                "stars": set()
-            }
+            graph.add_movie(row["id"], row["title"], row["year"])
 
     # Load stars
+    stars = []
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
             try:
-                people[row["person_id"]]["movies"].add(row["movie_id"])
-                movies[row["movie_id"]]["stars"].add(row["person_id"])
+                stars.append((graph.person_index[row["person_id"]], graph.movie_index[row["movie_id"]]))
             except KeyError:
                 pass
+    graph.build_edges(stars)
+    graph.label_components()
+    return graph
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(description="Find the degrees of separation between two people.")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="answer tab-separated source/target pairs from FILE ('-' for stdin) as JSON lines")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes for --batch and --serve (default: one per core)")
+    parser.add_argument("--ambiguous", choices=["strict", "most-films"], default="strict",
+                        help="how --batch resolves names shared by several people (default: strict, report an error)")
+    parser.add_argument("--landmarks", type=int, default=0, metavar="N",
+                        help="precompute distances from N landmark people to bound the degrees of separation")
+    parser.add_argument("--bounds", action="store_true",
+                        help="with --batch, report landmark bounds on the degrees instead of paths")
+    parser.add_argument("--serve", action="store_true",
+                        help="keep the data loaded and answer JSON-line requests over a socket (see client.py)")
+    parser.add_argument("--host", default="127.0.0.1", help="address for --serve")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port for --serve")
+    parser.add_argument("--socket", metavar="PATH", help="serve on a Unix socket instead of TCP")
+    parser.add_argument("--follow", type=float, metavar="SECONDS",
+                        help="with --serve, apply rows appended to the CSV files every SECONDS")
+    parser.add_argument("--years", type=year_range, metavar="START-END",
+                        help="only connect people through movies released in these years, e.g. 1980-2000 or 1990-")
+    args = parser.parse_args()
+    if args.bounds and not args.landmarks:
+        parser.error("--bounds needs --landmarks N")
+
+    if args.serve:
+        print("Loading data...", file=sys.stderr)
+        load_data(args.directory)
+        if args.landmarks:
+            build_landmarks(args.directory, args.landmarks)
+        #Exact name lookups need the index in every worker, so share one copy
+        name_index.build()
+        server = QueryServer(
+            {"path": path_request, "paths": paths_request, "resolve": resolve_request, "bounds": bounds_request},
+            background=["path", "paths"],
+            workers=args.workers,
+            refresh=read_updates if args.follow else None,
+            refresh_interval=args.follow,
+            rebuild=rebuild_landmarks if args.follow and args.landmarks else None,
+            rebuild_interval=LANDMARK_REBUILD_INTERVAL
+        )
+        where = args.socket or f"{args.host}:{args.port}"
+        print(f"Data loaded. Serving on {where}", file=sys.stderr)
+        server.run(args.host, args.port, args.socket)
+        return
+
+    if args.batch is not None:
+        #Keep stdout clean for the JSON lines
+        print("Loading data...", file=sys.stderr)
+        load_data(args.directory)
+        if args.landmarks:
+            build_landmarks(args.directory, args.landmarks)
+        print("Data loaded.", file=sys.stderr)
+        #Exact name lookups need the index in every worker, so share one copy
+        name_index.build()
+        policy = args.ambiguous.replace("-", "_")
+        if args.bounds:
+            answer = functools.partial(bounds_query, policy=policy)
+        else:
+            answer = functools.partial(answer_query, policy=policy, years=args.years)
+        if args.batch == "-":
+            run_batch(read_pairs(sys.stdin), answer, sys.stdout, args.workers)
+        else:
+            with open(args.batch, encoding="utf-8") as f:
+                run_batch(read_pairs(f), answer, sys.stdout, args.workers)
+        return
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(args.directory)
+    if args.landmarks:
+        build_landmarks(args.directory, args.landmarks)
     print("Data loaded.")
     
-    source = person_id_for_name(input("Name: "))
-    if source is None:
-        sys.exit("Person not found.")
-    target = person_id_for_name(input("Name: "))
-    if target is None:
-        sys.exit("Person not found.")
+    source = ask_for_person()
+    target = ask_for_person()
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, years=args.years)
 
     if path is None:
         print("Not connected.")
@@ -92,96 +353,223 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def year_range(text):
+    """
+    Parses a --years argument such as "1980-2000", "1980-" or "-2000"
+    into an inclusive (start, end) pair with None for an open end.
+    """
+    start, separator, end = text.partition("-")
+    try:
+        start = int(start) if start else None
+        end = int(end) if end else (None if separator else start)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid year range {text!r}")
+    if start is not None and end is not None and start > end:
+        raise argparse.ArgumentTypeError(f"year range {text!r} ends before it starts")
+    return start, end
+
+
+def rebuild_landmarks():
+    """
+    Builds a fresh landmark index if updates made the loaded one stale,
+    reading the data without changing it, so it can run on another thread
+    while nothing applies updates. Returns a function that installs the
+    new index, or None if the loaded one is current.
+    """
+    if landmarks is not None or not landmark_count:
+        return None
+    print("Rebuilding the landmark index after updates...", file=sys.stderr)
+    return functools.partial(install_landmarks, LandmarkIndex.build(graph, landmark_count))
+
+
+def install_landmarks(index):
+    """
+    Replaces the landmark index with `index`, returning True as the data changed.
+    """
+    global landmarks
+    landmarks = index
+    return True
+
+
+def ask_for_person():
+    """
+    Prompts for a name and returns its IMDB id, exiting with
+    suggestions if nobody has that name.
+    """
+    name = input("Name: ")
+    person_id = person_id_for_name(name)
+    if person_id is None:
+        suggestions = suggest_people(name)
+        if suggestions:
+            sys.exit("Person not found. Did you mean: " + ", ".join(describe(person_id) for person_id in suggestions))
+        sys.exit("Person not found.")
+    return person_id
+
+
+def shortest_path(source, target, bidirectional=True, years=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    People in different connected components are answered without
+    searching. Otherwise the search grows from both ends at once; pass
+    `bidirectional=False` to run the original one-sided search.
+
+    `years`, an inclusive (start, end) pair where either end may be None,
+    limits the path to movies released in that range.
+
     If no possible path, returns None.
     """
-    #I will declare my source as my start node on my frontier. 
-    frontier = QueueFrontier()
-    #setup my starting node:
-    initial_node = Node(source, None, neighbors_for_person(source))
-    #append my initial node:
-    frontier.add(initial_node)
-    found_solution = False
-    explored_nodes = {}
-    explored_states = {}
-    states_in_frontier = {}
-    i = 0
-    #Start iterating to determine the path:
-    while(not frontier.empty()):
-               
-        #This conuter is used in my print to keep track of the attempts
-        i= i+1
-        
-        #I extract one node:
-        current_node = frontier.remove()
-        #I will only explore the actions if I have not visited this node before:
-        explored_states[current_node.state] = "explored" #append(current_node.state)
-        explored_nodes[current_node] = "explored"
-        #I check if my current node is my solution:
-        if (current_node.state == target):
-            print("I have explored: ", len(explored_states), " states")
-            print("Found my solution")
-            found_solution = True
-            break
-        
-        else:
-            #Check if neighbor is in frontier.
-            neighbor_list = neighbors_for_person(current_node.state)
-            
-            for neighbor in neighbor_list:
-                #I setup my new node
-                new_state = neighbor[1]
-                new_parent = current_node
-                action_taken = neighbor[0]
-                new_node = Node(new_state, new_parent, action_taken)
-                #I check if this neighbor is actually my target. If it is, I can skip some frontier iterations:
-                
-                if (new_node.state == target):
-                    print("Found solution in a neighbor! Skipping unnecesary searches")
-                    frontier = QueueFrontier()
-                    frontier.add(new_node)
-                    states_in_frontier = {}
-                    states_in_frontier [new_node.state] = "seen"
-                    break;            
-                
-                #else, I add my new node to the frontier if it is not there already.
-                #Adittional note: I do not use the class method because on deep seaches it slows way too much the execution. Dictionaries have linear search time.
-                elif((not states_in_frontier.get(new_node.state)) and new_node.state != current_node.state and (not explored_states.get(new_node.state)) and (not explored_nodes.get(new_node))):
-                    frontier.add(new_node)
-                    states_in_frontier [new_node.state] = "seen"
-        if(i%10000 == 0):
-             print("I have explored: ", len(explored_states))
-    path = []
-    if (found_solution):
-        #I need to iterate backwards from my last explored node's parents. 
-        Solution_node = current_node
-        while(Solution_node.parent is not None):
-            path.append((Solution_node.action, Solution_node.state))
-            Solution_node = Solution_node.parent
-           
-        path.reverse()
-        #print(path)
-      
-        return path
-    
-    else:
-        #If we reach this point it means there is no available solution
-        print("I could not find a solution")
+    #People in different components can never be connected
+    if not graph.connected(graph.person_index[source], graph.person_index[target]):
         return None
+    if bidirectional:
+        return bidirectional_path(source, target, years)
+    return one_sided_path(source, target, years)
+
 
-def person_id_for_name(name):
+def build_landmarks(directory, count=DEFAULT_LANDMARKS):
+    """
+    Builds the landmark distance index for the loaded data, reusing the
+    copy cached in `directory` while the CSV files are unchanged.
+    """
+    global landmarks, landmark_count
+    landmark_count = count
+    stamp = source_stamp(directory)
+    path = os.path.join(directory, LANDMARKS_FILE)
+    landmarks = LandmarkIndex.load(path, stamp, len(graph.person_ids))
+    if landmarks is None or len(landmarks.landmarks) != count:
+        landmarks = LandmarkIndex.build(graph, count)
+        try:
+            landmarks.save(path, stamp)
+        except OSError:
+            pass
+
+
+def separation_bounds(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation between two
+    IMDB ids using only the landmark index; they are equal when exact.
+    """
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+    if not graph.connected(source, target):
+        return math.inf, math.inf
+    return landmarks.bounds(source, target)
+
+
+def bounds_query(pair, policy="strict"):
+    """
+    Answers one (source, target) pair with the landmark bounds on their
+    degrees of separation, without searching, as a JSON-serializable
+    dictionary. Unknown bounds (such as for disconnected people) are None.
+    """
+    if len(pair) != 2:
+        return {"input": pair[0], "error": "expected a tab-separated source and target"}
+    result = {"source": pair[0], "target": pair[1]}
+    if landmarks is None and landmark_count:
+        result["error"] = "the landmark index is out of date after updates and not rebuilt yet"
+        return result
+    if landmarks is None:
+        result["error"] = "no landmark index; start with --landmarks N"
+        return result
+    try:
+        source = resolve_person(pair[0], policy)
+        target = resolve_person(pair[1], policy)
+    except LookupError as error:
+        result["error"] = error.args[0]
+        return result
+    lower, upper = separation_bounds(source, target)
+    result["source_id"] = source
+    result["target_id"] = target
+    result["connected"] = lower != math.inf
+    result["lower"] = None if lower == math.inf else lower
+    result["upper"] = None if upper == math.inf else upper
+    result["exact"] = lower == upper and lower != math.inf
+    return result
+
+
+def bidirectional_path(source, target, years=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, growing a breadth-first
+    frontier from both people and always expanding the smaller one.
+
+    If no possible path, returns None.
+    """
+    return to_ids(searcher.bidirectional(graph.person_index[source], graph.person_index[target], years))
+
+
+def all_shortest_paths(source, target, years=None):
+    """
+    Lazily yields every shortest list of (movie_id, person_id) pairs that
+    connect the source to the target, so callers can stop after as many
+    as they need. Yields nothing if they are not connected.
+    """
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+    if not graph.connected(source, target):
+        return
+    for path in paths.all_shortest_paths(searcher, source, target, years):
+        yield to_ids(path)
+
+
+def k_shortest_paths(source, target, years=None):
+    """
+    Lazily yields loopless lists of (movie_id, person_id) pairs that
+    connect the source to the target, shortest first, so the first k
+    results are the k best alternatives.
+    """
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+    if not graph.connected(source, target):
+        return
+    for path in paths.k_shortest_paths(searcher, source, target, years):
+        yield to_ids(path)
+
+
+def one_sided_path(source, target, years=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target using a one-sided
+    breadth-first search from the source.
+
+    If no possible path, returns None.
+    """
+    source = graph.person_index[source]
+    target = graph.person_index[target]
+    return to_ids(searcher.breadth_first(source, target, years=years))
+
+
+def to_ids(path):
+    """
+    Converts a path of (movie_index, person_index) pairs back to IMDB ids.
+    """
+    if path is None:
+        return None
+    return [(graph.movie_ids[movie], graph.person_ids[person]) for movie, person in path]
+
+
+def person_id_for_name(name, policy="ask"):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    Names match case-, accent- and punctuation-insensitively, and "#<id>"
+    names a person by IMDB id. `policy` decides between several people
+    with the same name: "ask" prompts for their id, "most_films" picks
+    whoever starred in the most movies and "strict" returns None.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    if name.startswith("#"):
+        return name[1:] if name[1:] in people else None
+    person_ids = [graph.person_ids[person] for person in name_index.exact_matches(name)]
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
+        if policy == "most_films":
+            return person_ids[0]
+        elif policy == "strict":
+            return None
         print(f"Which '{name}'?")
         for person_id in person_ids:
             person = people[person_id]
@@ -199,16 +587,180 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
-def neighbors_for_person(person_id):
+def suggest_people(name, limit=5):
+    """
+    Returns up to `limit` IMDB ids of people whose names match `name`
+    exactly, by prefix or within a typo.
+    """
+    return [graph.person_ids[person] for person in name_index.lookup(name, limit)]
+
+
+def describe(person_id):
+    """
+    Returns "Name (birth, id)" for messages listing several people.
+    """
+    person = people[person_id]
+    return f"{person['name']} ({person['birth'] or 'birth unknown'}, #{person_id})"
+
+
+def resolve_person(name, policy="strict"):
+    """
+    Returns the IMDB id for a person's name or "#<id>" without ever
+    prompting, resolving ambiguities with `policy` ("strict" or
+    "most_films"). Bare IMDB ids are also accepted.
+
+    Raises LookupError, with suggestions, if it is unknown or ambiguous.
+    """
+    person_id = person_id_for_name(name, policy)
+    if person_id is not None:
+        return person_id
+    if name.startswith("#"):
+        raise LookupError(f"no person with id {name}")
+    matches = name_index.exact_matches(name)
+    if len(matches) > 1:
+        candidates = ", ".join(describe(graph.person_ids[person]) for person in matches)
+        raise LookupError(f"'{name}' is ambiguous: {candidates}")
+    if name in people:
+        return name
+    suggestions = ", ".join(describe(person_id) for person_id in suggest_people(name))
+    if suggestions:
+        raise LookupError(f"'{name}' not found; did you mean: {suggestions}")
+    raise LookupError(f"'{name}' not found")
+
+
+def answer_query(pair, policy="strict", years=None):
+    """
+    Answers one batch (source, target) pair with a JSON-serializable
+    dictionary, resolving ambiguous names with `policy` and only using
+    movies released within `years`, if given.
+    """
+    if len(pair) != 2:
+        return {"input": pair[0], "error": "expected a tab-separated source and target"}
+    result = {"source": pair[0], "target": pair[1]}
+    try:
+        source = resolve_person(pair[0], policy)
+        target = resolve_person(pair[1], policy)
+    except LookupError as error:
+        result["error"] = error.args[0]
+        return result
+    path = shortest_path(source, target, years=years)
+    result["source_id"] = source
+    result["target_id"] = target
+    result["degrees"] = None if path is None else len(path)
+    result["path"] = path
+    return result
+
+
+def path_request(request):
+    """
+    Server handler for {"op": "path", "source": ..., "target": ...};
+    an optional "policy" resolves ambiguous names (default "strict"), and
+    optional "years" [start, end] (either may be null) limits the movies used.
+    """
+    return answer_query((request["source"], request["target"]), request.get("policy", "strict"), request_years(request))
+
+
+def bounds_request(request):
+    """
+    Server handler for {"op": "bounds", "source": ..., "target": ...};
+    returns lower and upper bounds on their degrees of separation from the
+    landmark index (see --landmarks) without searching. Accepts "policy"
+    like "path".
+    """
+    return bounds_query((request["source"], request["target"]), request.get("policy", "strict"))
+
+
+def paths_request(request):
+    """
+    Server handler for {"op": "paths", "source": ..., "target": ...};
+    returns up to "limit" (default 10) shortest paths, or the "limit" best
+    loopless alternatives of any length if "alternatives" is true, in
+    which case "limit" may be at most MAX_ALTERNATIVES.
+    Accepts the same "policy" and "years" fields as "path".
+    """
+    years = request_years(request)
+    alternatives = request.get("alternatives")
+    limit = request_limit(request, MAX_ALTERNATIVES if alternatives else None)
+    result = answer_query((request["source"], request["target"]), request.get("policy", "strict"), years)
+    if "error" in result or result["path"] is None:
+        result["paths"] = []
+    else:
+        generate = k_shortest_paths if alternatives else all_shortest_paths
+        found = generate(result["source_id"], result["target_id"], years)
+        result["paths"] = list(itertools.islice(found, limit))
+    result.pop("path", None)
+    return result
+
+
+def request_limit(request, maximum=None):
+    """
+    Returns the "limit" of a server request, 10 if it is missing.
+
+    Raises ValueError unless it is a positive integer, no larger than
+    `maximum` if given.
+    """
+    limit = request.get("limit", 10)
+    if not isinstance(limit, int) or isinstance(limit, bool) or limit < 1:
+        raise ValueError(f"\"limit\" must be a positive integer, not {json.dumps(limit)}")
+    if maximum is not None and limit > maximum:
+        raise ValueError(f"\"limit\" must be at most {maximum}, not {limit}")
+    return limit
+
+
+def request_years(request):
+    """
+    Returns the (start, end) year range of a server request, or None.
+
+    Raises ValueError unless "years" is missing, null, or a list of two
+    integer years where either may be null and the first is not after the
+    second.
+    """
+    years = request.get("years")
+    if years is None:
+        return None
+    if (not isinstance(years, list) or len(years) != 2 or
+            any(year is not None and (not isinstance(year, int) or isinstance(year, bool)) for year in years)):
+        raise ValueError(f"\"years\" must be [start, end] with integer or null years, not {json.dumps(years)}")
+    start, end = years
+    if start is not None and end is not None and start > end:
+        raise ValueError(f"\"years\" {json.dumps(years)} ends before it starts")
+    return start, end
+
+
+def resolve_request(request):
+    """
+    Server handler for {"op": "resolve", "name": ...}; lists the people
+    matching that name exactly, by prefix or within a typo, best first.
+    Optional "limit" (default 10) and "fuzzy" (default true) fields tune it.
+
+    Raises ValueError unless "limit" is a positive integer.
+    """
+    matches = name_index.lookup(request["name"], request_limit(request), request.get("fuzzy", True))
+    return {
+        "name": request["name"],
+        "people": [
+            {
+                "id": graph.person_ids[person],
+                "name": graph.person_names[person],
+                "birth": graph.person_births[person],
+                "films": name_index.film_count(person)
+            }
+            for person in matches
+        ]
+    }
+
+
+def neighbors_for_person(person_id, years=None):
     """
     Returns (movie_id, person_id) pairs for people
-    who starred with a given person.
+    who starred with a given person, in movies released
+    within `years` if given.
     """
-    movie_ids = people[person_id]["movies"]
     neighbors = set()
-    for movie_id in movie_ids:
-        for person_id in movies[movie_id]["stars"]:
-            neighbors.add((movie_id, person_id))
+    for movie in searcher.movie_lister(years)(graph.person_index[person_id]):
+        movie_id = graph.movie_ids[movie]
+        for person in graph.stars_of(movie):
+            neighbors.add((movie_id, graph.person_ids[person]))
     return neighbors
 
 
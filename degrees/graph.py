@@ -0,0 +1,346 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+
+# Sort key of movies without a year; below every year a range can start at
+MISSING_YEAR = -2 ** 31
+LAST_YEAR = 2 ** 31 - 1
+
+
+class Graph():
+    """
+    Compact representation of the people/movies dataset.
+
+    IMDb person and movie ids are interned to dense ints at load time and the
+    person->movie and movie->person edges are stored as CSR arrays: the
+    movies of person `p` are `person_movies[person_offsets[p]:person_offsets[p + 1]]`
+    and the stars of movie `m` are `movie_people[movie_offsets[m]:movie_offsets[m + 1]]`.
+
+    Each person's movies are sorted by release year, and `person_movie_years`
+    holds the year of every entry of `person_movies`, so the movies from a
+    range of years are found by binary search.
+    """
+
+    def __init__(self):
+        # Interned ids and per-entity attributes, indexed by dense int
+        self.person_ids = []
+        self.person_index = {}
+        self.person_names = []
+        self.person_births = []
+        self.movie_ids = []
+        self.movie_index = {}
+        self.movie_titles = []
+        self.movie_years = []
+
+        # CSR edges in both directions
+        self.person_offsets = array("i", [0])
+        self.person_movies = array("i")
+        self.person_movie_years = array("i")
+        self.movie_offsets = array("i", [0])
+        self.movie_people = array("i")
+
+        # Connected component label of every person
+        self.component = array("i")
+
+        # Memory-mapped snapshot the arrays above point into, if any
+        self.snapshot = None
+
+        # Bytes of each CSV file the CSR arrays were built from
+        self.source_sizes = {}
+
+        # Edges applied after the CSR arrays were built, by person and by
+        # movie. People and movies past the end of the offsets have no CSR
+        # edges, and people past the end of `component` are labelled here.
+        self.added_movies = {}
+        self.added_people = {}
+        self.added_components = {}
+
+        # Component labels merged by applied edges, pointing towards the
+        # label that now represents them
+        self.merged_components = {}
+
+    def add_person(self, person_id, name, birth):
+        """
+        Interns a person and returns its dense index.
+        """
+        index = len(self.person_ids)
+        self.person_index[person_id] = index
+        self.person_ids.append(person_id)
+        self.person_names.append(name)
+        self.person_births.append(birth)
+        return index
+
+    def add_movie(self, movie_id, title, year):
+        """
+        Interns a movie and returns its dense index.
+        """
+        index = len(self.movie_ids)
+        self.movie_index[movie_id] = index
+        self.movie_ids.append(movie_id)
+        self.movie_titles.append(title)
+        self.movie_years.append(year)
+        return index
+
+    def build_edges(self, stars):
+        """
+        Builds both CSR edge arrays from an iterable of
+        (person_index, movie_index) pairs, dropping duplicates.
+        """
+        movie_count = len(self.movie_ids)
+        person_count = len(self.person_ids)
+
+        # Movies ranked by year; packing the rank rather than the movie
+        # index makes sorting the pairs group the edges by person and order
+        # each person's movies by year, the person->movie CSR order.
+        years = [year_number(year) for year in self.movie_years]
+        by_year = sorted(range(movie_count), key=years.__getitem__)
+        rank = array("i", [0]) * movie_count
+        for position, movie in enumerate(by_year):
+            rank[movie] = position
+        keys = sorted(set(person * movie_count + rank[movie] for person, movie in stars))
+
+        person_offsets = array("i", [0]) * (person_count + 1)
+        person_movies = array("i", [0]) * len(keys)
+        person_movie_years = array("i", [0]) * len(keys)
+        movie_counts = array("i", [0]) * (movie_count + 1)
+        for i, key in enumerate(keys):
+            person, position = divmod(key, movie_count)
+            movie = by_year[position]
+            person_offsets[person + 1] += 1
+            person_movies[i] = movie
+            person_movie_years[i] = years[movie]
+            movie_counts[movie + 1] += 1
+        for person in range(person_count):
+            person_offsets[person + 1] += person_offsets[person]
+        for movie in range(movie_count):
+            movie_counts[movie + 1] += movie_counts[movie]
+
+        # Counting sort of the same edges by movie for the reverse direction
+        movie_offsets = array("i", movie_counts)
+        movie_people = array("i", [0]) * len(keys)
+        for person in range(person_count):
+            for i in range(person_offsets[person], person_offsets[person + 1]):
+                movie = person_movies[i]
+                movie_people[movie_counts[movie]] = person
+                movie_counts[movie] += 1
+
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.person_movie_years = person_movie_years
+        self.movie_offsets = movie_offsets
+        self.movie_people = movie_people
+
+    def label_components(self):
+        """
+        Labels every person with the index of its connected component,
+        numbering components in order of their lowest person index.
+        """
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_people = self.movie_people
+        component = array("i", [-1]) * len(self.person_ids)
+        expanded = bytearray(len(self.movie_ids))
+        label = 0
+        for root in range(len(self.person_ids)):
+            if component[root] != -1:
+                continue
+            component[root] = label
+            stack = [root]
+            while stack:
+                person = stack.pop()
+                for i in range(person_offsets[person], person_offsets[person + 1]):
+                    movie = person_movies[i]
+                    if expanded[movie]:
+                        continue
+                    expanded[movie] = 1
+                    for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                        neighbor = movie_people[j]
+                        if component[neighbor] == -1:
+                            component[neighbor] = label
+                            stack.append(neighbor)
+            label += 1
+        self.component = component
+
+    def component_of(self, person):
+        """
+        Returns the label of a person's connected component.
+        """
+        if person < len(self.component):
+            label = self.component[person]
+        else:
+            label = self.added_components[person]
+        merged = self.merged_components
+        if label in merged:
+            root = label
+            while root in merged:
+                root = merged[root]
+            # Point every label on the way straight at the root
+            while label != root:
+                merged[label], label = root, merged[label]
+            return root
+        return label
+
+    def connected(self, source, target):
+        """
+        Returns whether two person indexes are in the same connected component.
+        """
+        return self.component_of(source) == self.component_of(target)
+
+    def apply_person(self, person_id, name, birth):
+        """
+        Adds a person to an already built graph in its own component and
+        returns its dense index, or None if the id is already known.
+        """
+        if person_id in self.person_index:
+            return None
+        person = self.add_person(person_id, name, birth)
+        # Existing labels are always smaller than the number of people
+        # labelled, so a new person's own index is a fresh label.
+        self.added_components[person] = person
+        return person
+
+    def apply_movie(self, movie_id, title, year):
+        """
+        Adds a movie to an already built graph and returns its dense
+        index, or None if the id is already known.
+        """
+        if movie_id in self.movie_index:
+            return None
+        return self.add_movie(movie_id, title, year)
+
+    def apply_star(self, person, movie):
+        """
+        Adds a person->movie edge to an already built graph in time
+        proportional to the person's movie count, merging components if
+        it connects two. Returns False if the edge already existed.
+        """
+        if movie in self.movies_of(person):
+            return False
+        stars = self.stars_of(movie)
+        if len(stars):
+            # Everyone already in the movie shares one component
+            joined = self.component_of(stars[0])
+            label = self.component_of(person)
+            if joined != label:
+                self.merged_components[label] = joined
+        self.added_movies.setdefault(person, []).append(movie)
+        self.added_people.setdefault(movie, []).append(person)
+        return True
+
+    def movies_of(self, person):
+        """
+        Returns the movie indexes a person starred in.
+        """
+        offsets = self.person_offsets
+        if person < len(offsets) - 1:
+            movies = self.person_movies[offsets[person]:offsets[person + 1]]
+        else:
+            movies = ()
+        if self.added_movies and person in self.added_movies:
+            return list(movies) + self.added_movies[person]
+        return movies
+
+    def movies_between(self, person, start=MISSING_YEAR + 1, end=LAST_YEAR):
+        """
+        Returns the movie indexes a person starred in that were released
+        from year `start` to year `end` inclusive, in time logarithmic in
+        the person's movie count. Movies without a year never match.
+        """
+        offsets = self.person_offsets
+        if person < len(offsets) - 1:
+            first = offsets[person]
+            last = offsets[person + 1]
+            years = self.person_movie_years
+            movies = self.person_movies[bisect_left(years, start, first, last):bisect_right(years, end, first, last)]
+        else:
+            movies = ()
+        if self.added_movies and person in self.added_movies:
+            movie_years = self.movie_years
+            return list(movies) + [
+                movie for movie in self.added_movies[person]
+                if start <= year_number(movie_years[movie]) <= end
+            ]
+        return movies
+
+    def stars_of(self, movie):
+        """
+        Returns the person indexes that starred in a movie.
+        """
+        offsets = self.movie_offsets
+        if movie < len(offsets) - 1:
+            stars = self.movie_people[offsets[movie]:offsets[movie + 1]]
+        else:
+            stars = ()
+        if self.added_people and movie in self.added_people:
+            return list(stars) + self.added_people[movie]
+        return stars
+
+    def film_count(self, person):
+        """
+        Returns how many movies a person starred in.
+        """
+        return len(self.movies_of(person))
+
+
+def year_number(year):
+    """
+    Returns a movies.csv year as an int, or MISSING_YEAR if it is blank.
+    """
+    return int(year) if year.isdigit() else MISSING_YEAR
+
+
+class PeopleView(Mapping):
+    """
+    Read-only mapping of IMDb person ids to a dictionary of:
+    name, birth, movies (a set of movie_ids), backed by a Graph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, person_id):
+        graph = self.graph
+        person = graph.person_index[person_id]
+        return {
+            "name": graph.person_names[person],
+            "birth": graph.person_births[person],
+            "movies": {graph.movie_ids[movie] for movie in graph.movies_of(person)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.person_ids)
+
+    def __len__(self):
+        return len(self.graph.person_ids)
+
+    def __contains__(self, person_id):
+        return person_id in self.graph.person_index
+
+
+class MoviesView(Mapping):
+    """
+    Read-only mapping of IMDb movie ids to a dictionary of:
+    title, year, stars (a set of person_ids), backed by a Graph.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+
+    def __getitem__(self, movie_id):
+        graph = self.graph
+        movie = graph.movie_index[movie_id]
+        return {
+            "title": graph.movie_titles[movie],
+            "year": graph.movie_years[movie],
+            "stars": {graph.person_ids[person] for person in graph.stars_of(movie)}
+        }
+
+    def __iter__(self):
+        return iter(self.graph.movie_ids)
+
+    def __len__(self):
+        return len(self.graph.movie_ids)
+
+    def __contains__(self, movie_id):
+        return movie_id in self.graph.movie_index
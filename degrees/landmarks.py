@@ -0,0 +1,133 @@
+import json
+import math
+import os
+from array import array
+
+# Distances are stored one byte per person; this marks "not reachable"
+UNREACHABLE = 255
+DEFAULT_LANDMARKS = 16
+LANDMARKS_FILE = ".degrees.landmarks"
+
+
+class LandmarkIndex():
+    """
+    Breadth-first distances from a few high-degree "landmark" people to
+    everyone else. By the triangle inequality they bound the separation of
+    any two people in O(#landmarks).
+    """
+
+    def __init__(self, landmarks, distances):
+        # Person indexes of the landmarks and one distance array per landmark
+        self.landmarks = landmarks
+        self.distances = distances
+
+    @classmethod
+    def build(cls, graph, count=DEFAULT_LANDMARKS):
+        """
+        Picks the `count` people with the most co-star edges as
+        landmarks and runs a full breadth-first search from each.
+        """
+        degrees = []
+        for person in range(len(graph.person_ids)):
+            degree = 0
+            for movie in graph.movies_of(person):
+                degree += len(graph.stars_of(movie))
+            degrees.append(degree)
+        landmarks = sorted(range(len(degrees)), key=degrees.__getitem__, reverse=True)[:count]
+        return cls(landmarks, [breadth_first_distances(graph, landmark) for landmark in landmarks])
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation between
+        two person indexes. `lower` is math.inf if some landmark proves them
+        disconnected; `upper` is math.inf if no landmark reaches both.
+        """
+        if source == target:
+            return 0, 0
+        lower = 0
+        upper = math.inf
+        for distances in self.distances:
+            to_source = distances[source]
+            to_target = distances[target]
+            if to_source == UNREACHABLE or to_target == UNREACHABLE:
+                if to_source != to_target:
+                    return math.inf, math.inf
+                continue
+            lower = max(lower, abs(to_source - to_target))
+            upper = min(upper, to_source + to_target)
+        # Distinct people are at least one degree apart
+        return max(lower, 1), upper
+
+    def heuristic(self, person, target):
+        """
+        Returns an admissible, consistent estimate of the remaining
+        degrees of separation from `person` to `target`.
+        """
+        estimate = 0
+        for distances in self.distances:
+            to_person = distances[person]
+            to_target = distances[target]
+            if to_person != UNREACHABLE and to_target != UNREACHABLE:
+                estimate = max(estimate, abs(to_person - to_target))
+        return estimate
+
+    def save(self, path, stamp):
+        """
+        Writes the index to `path`, tagged with the CSV `stamp` it was built from.
+        """
+        header = json.dumps({"sources": stamp, "landmarks": self.landmarks}).encode("utf-8")
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(len(header).to_bytes(4, "little"))
+            f.write(header)
+            for distances in self.distances:
+                f.write(distances.tobytes())
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path, stamp, person_count):
+        """
+        Reads an index written by `save`, or returns None if it is
+        missing or was built from different CSV files.
+        """
+        try:
+            with open(path, "rb") as f:
+                header = json.loads(f.read(int.from_bytes(f.read(4), "little")))
+                if header["sources"] != stamp:
+                    return None
+                distances = []
+                for _ in header["landmarks"]:
+                    row = array("B")
+                    row.fromfile(f, person_count)
+                    distances.append(row)
+        except (OSError, ValueError, EOFError, KeyError):
+            return None
+        return cls(header["landmarks"], distances)
+
+
+def breadth_first_distances(graph, source):
+    """
+    Returns an array of the degrees of separation from `source` to every
+    person index, capped at UNREACHABLE.
+    """
+    movies_of = graph.movies_of
+    stars_of = graph.stars_of
+    distances = array("B", [UNREACHABLE]) * len(graph.person_ids)
+    expanded = bytearray(len(graph.movie_ids))
+    distances[source] = 0
+    frontier = [source]
+    depth = 0
+    while frontier and depth + 1 < UNREACHABLE:
+        depth += 1
+        next_layer = []
+        for person in frontier:
+            for movie in movies_of(person):
+                if expanded[movie]:
+                    continue
+                expanded[movie] = 1
+                for neighbor in stars_of(movie):
+                    if distances[neighbor] == UNREACHABLE:
+                        distances[neighbor] = depth
+                        next_layer.append(neighbor)
+        frontier = next_layer
+    return distances
@@ -0,0 +1,382 @@
+import heapq
+import itertools
+import re
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections.abc import Mapping
+
+# Prefix queries on very short strings would match most of the index
+MAX_PREFIX_EXPANSIONS = 256
+
+# Names and tokens added after the build are kept in small sorted lists
+# until they outnumber this fraction of the main ones, then merged in
+MERGE_FRACTION = 1 / 64
+
+SEPARATORS = re.compile(r"[\W_]+")
+
+
+def normalize(name):
+    """
+    Lowercases a name, strips accents and collapses punctuation and
+    whitespace, so "Zoë  Saldaña" and "zoe saldana" normalize alike.
+    """
+    name = name.lower()
+    if not name.isascii():
+        name = "".join(c for c in unicodedata.normalize("NFKD", name) if not unicodedata.combining(c))
+    return SEPARATORS.sub(" ", name).strip()
+
+
+class NamesView(Mapping):
+    """
+    Read-only mapping of lowercased names to a set of the corresponding
+    person_ids, backed by the exact matches of a NameIndex. Iterating it
+    or taking its length walks every person.
+    """
+
+    def __init__(self, name_index):
+        self.name_index = name_index
+
+    def __getitem__(self, name):
+        graph = self.name_index.graph
+        # Normalizing folds more than lowercasing, so keep the exact ones
+        person_ids = {
+            graph.person_ids[person] for person in self.name_index.exact_matches(name)
+            if graph.person_names[person].lower() == name
+        }
+        if not person_ids:
+            raise KeyError(name)
+        return person_ids
+
+    def __iter__(self):
+        return iter(dict.fromkeys(name.lower() for name in self.name_index.graph.person_names))
+
+    def __len__(self):
+        return len({name.lower() for name in self.name_index.graph.person_names})
+
+    def __contains__(self, name):
+        try:
+            self[name]
+        except (KeyError, AttributeError):
+            return False
+        return True
+
+
+class NameIndex():
+    """
+    Lookup structures over the people of a Graph:
+
+    * an exact dictionary from normalized full name to person indexes,
+    * the normalized full names in sorted order, for prefix queries,
+    * an inverted index from normalized name token to person indexes,
+      with the tokens in sorted order for token-prefix queries,
+    * a symmetric-delete table over the tokens for typo-tolerant queries
+      (one insertion, deletion, substitution or transposition per token),
+      built the first time a fuzzy query needs it. Most queries are exact
+      names, and the table takes several times longer to build than the
+      rest of the index, so it is not built ahead of time; a process that
+      forks workers before any fuzzy query leaves each worker to build its
+      own copy when it first needs one.
+
+    Nothing is built until the first lookup, so loading a snapshot does
+    not pay for an index that may never be used. People added after the
+    index was built are indexed by `add`, and `starred` notes a person
+    whose film count grew, so the lists holding them are put back in order
+    the next time a lookup reads them. Both take time independent of the
+    size of the index.
+
+    Every lookup returns person indexes, best tier first and, within a
+    tier, the people who starred in the most movies first. Each person
+    list is kept in that order, so a lookup merges the lists it matches
+    lazily and stops after `limit` people instead of ranking them all.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.exact = None
+        self.postings = None
+        self.sorted_names = None
+        self.sorted_tokens = None
+        self.delete_hashes = None
+        self.delete_tokens = None
+        # The tokens the delete table refers to, and deletions of tokens
+        # added since it was built
+        self.fuzzy_tokens = None
+        self.added_deletes = {}
+        # Names and tokens added since the build, sorted, not yet merged
+        # into `sorted_names` and `sorted_tokens`
+        self.added_names = []
+        self.added_tokens = []
+        # People whose film count grew, by the name and tokens listing them
+        self.moved_names = {}
+        self.moved_tokens = {}
+
+    def build(self):
+        """
+        Builds the exact, prefix and token structures if they are not
+        built yet. Called by every lookup; call it directly to build them
+        ahead of time, such as before forking workers.
+        """
+        if self.exact is not None:
+            return
+        exact = {}
+        postings = {}
+        for person, name in enumerate(self.graph.person_names):
+            key = normalize(name)
+            exact.setdefault(key, []).append(person)
+            for token in set(key.split()):
+                postings.setdefault(token, []).append(person)
+        for people in itertools.chain(exact.values(), postings.values()):
+            people.sort(key=self.film_count, reverse=True)
+        self.sorted_names = sorted(exact)
+        self.sorted_tokens = sorted(postings)
+        self.postings = postings
+        self.exact = exact
+
+    def add(self, person):
+        """
+        Indexes a person added to the graph after the index was built.
+        """
+        if self.exact is None:
+            # The graph already has them, so the first build will index them
+            return
+        key = normalize(self.graph.person_names[person])
+        if key not in self.exact:
+            insort(self.added_names, key)
+        # Nobody has fewer films than a person just added, so appending
+        # keeps the lists in order
+        self.exact.setdefault(key, []).append(person)
+        for token in set(key.split()):
+            if token not in self.postings:
+                insort(self.added_tokens, token)
+                if self.delete_hashes is not None:
+                    for variant in deletes(token):
+                        self.added_deletes.setdefault(variant, []).append(token)
+            self.postings.setdefault(token, []).append(person)
+        if (len(self.added_names) > MERGE_FRACTION * len(self.sorted_names) or
+                len(self.added_tokens) > MERGE_FRACTION * len(self.sorted_tokens)):
+            self.merge_added()
+
+    def merge_added(self):
+        """
+        Merges the names and tokens added since the build into the sorted lists.
+        """
+        # Two sorted runs, which sort merges in linear time
+        self.sorted_names = sorted(self.sorted_names + self.added_names)
+        self.sorted_tokens = sorted(self.sorted_tokens + self.added_tokens)
+        self.added_names = []
+        self.added_tokens = []
+
+    def starred(self, person):
+        """
+        Notes that a person's film count grew since they were indexed, so
+        each list holding them is reordered the next time it is read.
+        """
+        if self.exact is None:
+            return
+        key = normalize(self.graph.person_names[person])
+        self.moved_names.setdefault(key, set()).add(person)
+        for token in set(key.split()):
+            self.moved_tokens.setdefault(token, set()).add(person)
+
+    def named(self, key):
+        """
+        Returns the people whose normalized full name is `key`, most films first.
+        """
+        people = self.exact.get(key, [])
+        if key in self.moved_names:
+            reorder(people, self.moved_names.pop(key), self.film_count)
+        return people
+
+    def posting(self, token):
+        """
+        Returns the people with `token` in their normalized name, most films first.
+        """
+        people = self.postings[token]
+        if token in self.moved_tokens:
+            reorder(people, self.moved_tokens.pop(token), self.film_count)
+        return people
+
+    def film_count(self, person):
+        """
+        Returns how many movies a person starred in.
+        """
+        return self.graph.film_count(person)
+
+    def exact_matches(self, query):
+        """
+        Returns the people whose normalized name equals the query's.
+        """
+        self.build()
+        return list(self.named(normalize(query)))
+
+    def lookup(self, query, limit=10, fuzzy=True):
+        """
+        Returns up to `limit` person indexes matching `query`: exact
+        matches, then full-name prefix matches, then people whose name
+        tokens all match the query's tokens (the last one as a prefix),
+        then, if `fuzzy`, people matching every token within one edit.
+        """
+        key = normalize(query)
+        if not key or limit < 1:
+            return []
+        self.build()
+        results = []
+        seen = set()
+        tiers = [
+            lambda: self.named(key),
+            lambda: self.name_prefix_matches(key),
+            lambda: self.token_matches(key.split(), self.token_prefix_matches),
+        ]
+        if fuzzy:
+            tiers.append(lambda: self.token_matches(key.split(), self.fuzzy_token_matches))
+        for tier in tiers:
+            for person in tier():
+                if person not in seen:
+                    seen.add(person)
+                    results.append(person)
+                    if len(results) >= limit:
+                        return results
+        return results
+
+    def merged(self, lists):
+        """
+        Lazily merges person lists that are each ordered by film count,
+        most first, into one such sequence.
+        """
+        if len(lists) == 1:
+            return iter(lists[0])
+        return heapq.merge(*lists, key=self.film_count, reverse=True)
+
+    def name_prefix_matches(self, key):
+        """
+        Returns the people whose normalized full name starts with `key`,
+        most films first.
+        """
+        names = starting_with(key, self.sorted_names, self.added_names)
+        return self.merged([self.named(name) for name in names])
+
+    def token_matches(self, tokens, expand):
+        """
+        Yields the people having, for every query token, a name token in
+        `expand(token, is_last)`, most films first.
+
+        Only the query token matching the fewest people is read from the
+        postings; each of its people is then checked against the other
+        tokens through their own name.
+        """
+        expansions = [set(expand(token, position == len(tokens) - 1)) for position, token in enumerate(tokens)]
+        if not all(expansions):
+            return
+        sizes = [sum(len(self.postings[match]) for match in expansion) for expansion in expansions]
+        rarest = sizes.index(min(sizes))
+        others = expansions[:rarest] + expansions[rarest + 1:]
+        names = self.graph.person_names
+        for person in self.merged([self.posting(match) for match in sorted(expansions[rarest])]):
+            if others:
+                name_tokens = normalize(names[person]).split()
+                if not all(any(token in expansion for token in name_tokens) for expansion in others):
+                    continue
+            yield person
+
+    def token_prefix_matches(self, token, is_last):
+        """
+        Returns the index tokens equal to `token`, or starting with it
+        if it is the last (possibly unfinished) query token.
+        """
+        if not is_last:
+            return [token] if token in self.postings else []
+        return starting_with(token, self.sorted_tokens, self.added_tokens)
+
+    def fuzzy_token_matches(self, token, is_last):
+        """
+        Returns the index tokens within one edit of `token`.
+        """
+        if self.delete_hashes is None:
+            self.build_delete_table()
+        matches = set()
+        for variant in deletes(token):
+            position = bisect_left(self.delete_hashes, hash(variant))
+            while position < len(self.delete_hashes) and self.delete_hashes[position] == hash(variant):
+                candidate = self.fuzzy_tokens[self.delete_tokens[position]]
+                if within_one_edit(token, candidate):
+                    matches.add(candidate)
+                position += 1
+            for candidate in self.added_deletes.get(variant, ()):
+                if within_one_edit(token, candidate):
+                    matches.add(candidate)
+        return matches
+
+    def build_delete_table(self):
+        """
+        Builds the symmetric-delete table: every token and each of its
+        single-character deletions, stored as sorted (hash, token) arrays
+        rather than a dictionary to keep it compact.
+        """
+        self.build()
+        self.merge_added()
+        self.fuzzy_tokens = list(self.sorted_tokens)
+        self.added_deletes = {}
+        entries = sorted(
+            (hash(variant), token_index)
+            for token_index, token in enumerate(self.fuzzy_tokens)
+            for variant in deletes(token)
+        )
+        self.delete_hashes = array("q", (entry[0] for entry in entries))
+        self.delete_tokens = array("i", (entry[1] for entry in entries))
+
+
+def starting_with(prefix, *sorted_lists):
+    """
+    Returns up to MAX_PREFIX_EXPANSIONS strings starting with `prefix`
+    from the given sorted lists, in sorted order.
+    """
+    matches = []
+    for strings in sorted_lists:
+        start = bisect_left(strings, prefix)
+        for string in strings[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not string.startswith(prefix):
+                break
+            matches.append(string)
+    return sorted(matches)[:MAX_PREFIX_EXPANSIONS]
+
+
+def reorder(people, moved, film_count):
+    """
+    Puts the people in `moved`, whose film count grew, back in place in
+    `people`, a list otherwise ordered by film count, most first. Each is
+    placed behind the others with as many films, like a newly counted film.
+    """
+    people[:] = [person for person in people if person not in moved]
+    for person in sorted(moved):
+        count = -film_count(person)
+        people.insert(bisect_right(people, count, key=lambda other: -film_count(other)), person)
+
+
+def deletes(token):
+    """
+    Returns `token` and every string obtained by deleting one of its characters.
+    """
+    return {token} | {token[:i] + token[i + 1:] for i in range(len(token))}
+
+
+def within_one_edit(first, second):
+    """
+    Returns whether two strings differ by at most one insertion,
+    deletion, substitution or adjacent transposition.
+    """
+    if abs(len(first) - len(second)) > 1:
+        return False
+    if len(first) > len(second):
+        first, second = second, first
+    i = 0
+    while i < len(first) and first[i] == second[i]:
+        i += 1
+    if len(first) < len(second):
+        # One insertion at the first mismatch
+        return first[i:] == second[i + 1:]
+    if i == len(first) or first[i + 1:] == second[i + 1:]:
+        # Identical, or one substitution at the first mismatch
+        return True
+    return (i + 1 < len(first) and first[i] == second[i + 1] and first[i + 1] == second[i] and
+            first[i + 2:] == second[i + 2:])
@@ -0,0 +1,105 @@
+import heapq
+import itertools
+
+
+def all_shortest_paths(searcher, source, target, years=None):
+    """
+    Lazily yields every shortest list of (movie_index, person_index)
+    pairs from `source` to `target`, using only movies released within
+    `years` if it is given.
+
+    One breadth-first pass records each person's depth; the predecessor
+    DAG is then walked backwards from the target, computing each person's
+    predecessors (co-stars one layer shallower) on demand. Only the
+    current path and one predecessor iterator per step are held in memory,
+    however many shortest paths there are.
+    """
+    distance = searcher.layers(source, target, years)
+    if distance == -1:
+        return
+    if distance == 0:
+        yield []
+        return
+    state = searcher.layered
+    epoch = state.epoch
+    movies_of = searcher.movie_lister(years)
+
+    # The people on the current partial path, each with an iterator over
+    # its predecessors, and the steps taken from them towards the target.
+    stack = [(target, predecessors(searcher, target, movies_of))]
+    steps = []
+    while stack:
+        if state.epoch != epoch:
+            raise RuntimeError("another all_shortest_paths search reused this searcher")
+        person, candidates = stack[-1]
+        step = next(candidates, None)
+        if step is None:
+            stack.pop()
+            if steps:
+                steps.pop()
+            continue
+        movie, previous = step
+        steps.append((movie, person))
+        if previous == source:
+            yield steps[::-1]
+            steps.pop()
+        else:
+            stack.append((previous, predecessors(searcher, previous, movies_of)))
+
+
+def predecessors(searcher, person, movies_of):
+    """
+    Yields the (movie_index, person_index) pairs through which `person` is
+    reached from the previous breadth-first layer of `searcher.layered`,
+    through the movies listed by `movies_of`.
+    """
+    graph = searcher.graph
+    state = searcher.layered
+    epoch = state.epoch
+    person_epoch = state.person_epoch
+    depth = state.depth
+    previous_depth = depth[person] - 1
+    for movie in movies_of(person):
+        for neighbor in graph.stars_of(movie):
+            if person_epoch[neighbor] == epoch and depth[neighbor] == previous_depth:
+                yield movie, neighbor
+
+
+def k_shortest_paths(searcher, source, target, years=None):
+    """
+    Lazily yields loopless lists of (movie_index, person_index) pairs from
+    `source` to `target` in order of length (Yen's algorithm), so callers
+    can stop after the first k alternatives. Paths through different
+    movies between the same people count as different paths. Only movies
+    released within `years` are used, if it is given.
+    """
+    first = searcher.bidirectional(source, target, years)
+    if first is None:
+        return
+    found = [first]
+    yield first
+    candidates = []
+    queued = set()
+    counter = itertools.count()
+    while True:
+        previous = found[-1]
+        people = [source] + [person for _, person in previous]
+        for spur in range(len(previous)):
+            # Steps out of the spur person already taken by found paths
+            # sharing this root are blocked, as are the root's people.
+            root = previous[:spur]
+            blocked_steps = {path[spur] for path in found if path[:spur] == root}
+            blocked_people = set(people[:spur])
+            spur_path = searcher.breadth_first(people[spur], target, blocked_people, blocked_steps, years)
+            if spur_path is None:
+                continue
+            candidate = root + spur_path
+            key = tuple(candidate)
+            if key not in queued:
+                queued.add(key)
+                heapq.heappush(candidates, (len(candidate), next(counter), candidate))
+        if not candidates:
+            return
+        _, _, path = heapq.heappop(candidates)
+        found.append(path)
+        yield path
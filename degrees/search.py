@@ -0,0 +1,262 @@
+from array import array
+from collections import deque
+
+from graph import LAST_YEAR, MISSING_YEAR
+
+
+class SearchState():
+    """
+    Visited marks and predecessors for one side of a search, preallocated
+    once per graph and reused by every query.
+
+    Instead of clearing the arrays, each query starts a new epoch: a person
+    or movie belongs to the current search only if its stamp equals it.
+    """
+
+    def __init__(self, person_count, movie_count):
+        self.person_epoch = array("i", [0]) * person_count
+        self.movie_epoch = array("i", [0]) * movie_count
+        # Predecessor person and the movie it was reached through
+        self.parents = array("i", [0]) * person_count
+        self.via = array("i", [0]) * person_count
+        # Breadth-first depth, used when enumerating every shortest path
+        self.depth = array("i", [0]) * person_count
+        self.epoch = 0
+
+    def grow(self, person_count, movie_count):
+        """
+        Extends the buffers to cover people and movies added to the graph.
+        """
+        for buffer in (self.person_epoch, self.parents, self.via, self.depth):
+            buffer.extend(array("i", [0]) * (person_count - len(buffer)))
+        self.movie_epoch.extend(array("i", [0]) * (movie_count - len(self.movie_epoch)))
+
+    def reset(self):
+        """
+        Starts a new search in constant time.
+        """
+        self.epoch += 1
+        if self.epoch == 2 ** 31 - 1:
+            # Stamps would overflow, so clear them once every 2**31 searches
+            for stamps in (self.person_epoch, self.movie_epoch):
+                stamps[:] = array("i", [0]) * len(stamps)
+            self.epoch = 1
+
+    def visit(self, person, parent, movie):
+        """
+        Marks `person` as reached from `parent` through `movie`.
+        """
+        self.person_epoch[person] = self.epoch
+        self.parents[person] = parent
+        self.via[person] = movie
+
+    def path_to(self, person):
+        """
+        Returns the (movie_index, person_index) pairs leading from
+        this side's root to `person`.
+        """
+        path = []
+        while self.parents[person] != person:
+            path.append((self.via[person], person))
+            person = self.parents[person]
+        path.reverse()
+        return path
+
+
+class Searcher():
+    """
+    Breadth-first searches over a Graph that allocate no per-query
+    visited state: it lives in reusable SearchStates and the one-sided
+    frontier is a deque. Each expansion still copies the person's or
+    movie's slice of the CSR arrays, which is done in C and is cheaper
+    than indexing the arrays one offset at a time in Python.
+
+    A Searcher is not safe to share between threads; use one per thread
+    or process.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.forward = SearchState(len(graph.person_ids), len(graph.movie_ids))
+        self.backward = SearchState(len(graph.person_ids), len(graph.movie_ids))
+        # Kept apart so path generators survive other searches in between
+        self.layered = SearchState(len(graph.person_ids), len(graph.movie_ids))
+
+    def grow(self):
+        """
+        Makes room for people and movies added to the graph since the
+        Searcher was created.
+        """
+        for state in (self.forward, self.backward, self.layered):
+            state.grow(len(self.graph.person_ids), len(self.graph.movie_ids))
+
+    def movie_lister(self, years=None):
+        """
+        Returns a function listing the movie indexes of a person, limited
+        to those released within `years`, an inclusive (start, end) pair
+        where either end may be None, if it is given.
+        """
+        if years is None:
+            return self.graph.movies_of
+        start, end = years
+        start = MISSING_YEAR + 1 if start is None else start
+        end = LAST_YEAR if end is None else end
+        movies_between = self.graph.movies_between
+        return lambda person: movies_between(person, start, end)
+
+    def breadth_first(self, source, target, blocked_people=None, blocked_steps=None, years=None):
+        """
+        Returns the shortest list of (movie_index, person_index) pairs from
+        `source` to `target` using a one-sided search, or None.
+
+        People in `blocked_people` are never visited, and the first step
+        may not be any (movie_index, person_index) pair in `blocked_steps`.
+        Only movies released within `years` are used, if it is given.
+        """
+        graph = self.graph
+        movies_of = self.movie_lister(years)
+        stars_of = graph.stars_of
+        state = self.forward
+        state.reset()
+        epoch = state.epoch
+        person_epoch = state.person_epoch
+        movie_epoch = state.movie_epoch
+
+        state.visit(source, source, -1)
+        for person in blocked_people or ():
+            person_epoch[person] = epoch
+        frontier = deque([source])
+        while frontier:
+            person = frontier.popleft()
+            if person == target:
+                return state.path_to(target)
+            # Movies left unexpanded by a restricted first step may still
+            # reach their blocked stars later through someone else.
+            restricted = blocked_steps if person == source else None
+            for movie in movies_of(person):
+                if movie_epoch[movie] == epoch:
+                    continue
+                if restricted is None:
+                    movie_epoch[movie] = epoch
+                for neighbor in stars_of(movie):
+                    if person_epoch[neighbor] != epoch:
+                        if restricted is not None and (movie, neighbor) in restricted:
+                            continue
+                        state.visit(neighbor, person, movie)
+                        frontier.append(neighbor)
+        return None
+
+    def layers(self, source, target, years=None):
+        """
+        Runs a breadth-first search from `source` that records the depth of
+        every person reached in `self.layered`, stopping as soon as `target`
+        is found. Every layer shallower than the target's is then complete.
+
+        Returns the target's depth, or -1 if it is not reachable.
+        """
+        graph = self.graph
+        movies_of = self.movie_lister(years)
+        stars_of = graph.stars_of
+        state = self.layered
+        state.reset()
+        epoch = state.epoch
+        person_epoch = state.person_epoch
+        movie_epoch = state.movie_epoch
+        depth = state.depth
+
+        person_epoch[source] = epoch
+        depth[source] = 0
+        if source == target:
+            return 0
+        frontier = [source]
+        distance = 0
+        while frontier:
+            distance += 1
+            next_layer = []
+            for person in frontier:
+                for movie in movies_of(person):
+                    if movie_epoch[movie] == epoch:
+                        continue
+                    movie_epoch[movie] = epoch
+                    for neighbor in stars_of(movie):
+                        if person_epoch[neighbor] != epoch:
+                            person_epoch[neighbor] = epoch
+                            depth[neighbor] = distance
+                            if neighbor == target:
+                                return distance
+                            next_layer.append(neighbor)
+            frontier = next_layer
+        return -1
+
+    def bidirectional(self, source, target, years=None):
+        """
+        Returns the shortest list of (movie_index, person_index) pairs from
+        `source` to `target`, or None if they are not connected.
+
+        Frontiers grow from both people, always expanding the smaller one.
+        Each movie is expanded at most once per side. Only movies released
+        within `years` are used, if it is given.
+        """
+        if source == target:
+            return []
+        movies_of = self.movie_lister(years)
+        forward = self.forward
+        backward = self.backward
+        forward.reset()
+        backward.reset()
+        forward.visit(source, source, -1)
+        backward.visit(target, target, -1)
+        forward_frontier = [source]
+        backward_frontier = [target]
+
+        while forward_frontier and backward_frontier:
+            if len(forward_frontier) <= len(backward_frontier):
+                forward_frontier, meeting = self._expand_layer(forward_frontier, forward, backward, movies_of)
+            else:
+                backward_frontier, meeting = self._expand_layer(backward_frontier, backward, forward, movies_of)
+            if meeting != -1:
+                return self._join_halves(meeting)
+        return None
+
+    def _expand_layer(self, frontier, side, other, movies_of):
+        """
+        Expands a whole breadth-first layer of one side of a bidirectional
+        search through the movies listed by `movies_of`. Returns the next
+        layer and the first person already reached by the other side, or
+        -1 if the halves have not met yet.
+        """
+        stars_of = self.graph.stars_of
+        epoch = side.epoch
+        person_epoch = side.person_epoch
+        movie_epoch = side.movie_epoch
+        other_epoch = other.epoch
+        other_person_epoch = other.person_epoch
+        next_layer = []
+        for person in frontier:
+            for movie in movies_of(person):
+                if movie_epoch[movie] == epoch:
+                    continue
+                movie_epoch[movie] = epoch
+                for neighbor in stars_of(movie):
+                    if person_epoch[neighbor] == epoch:
+                        continue
+                    side.visit(neighbor, person, movie)
+                    # The previous layers never met, so any meeting found
+                    # while expanding a full layer lies on a shortest path.
+                    if other_person_epoch[neighbor] == other_epoch:
+                        return next_layer, neighbor
+                    next_layer.append(neighbor)
+        return next_layer, -1
+
+    def _join_halves(self, meeting):
+        """
+        Joins both halves of a bidirectional search that met at `meeting`
+        into a list of (movie_index, person_index) pairs.
+        """
+        path = self.forward.path_to(meeting)
+        backward = self.backward
+        person = meeting
+        while backward.parents[person] != person:
+            path.append((backward.via[person], backward.parents[person]))
+            person = backward.parents[person]
+        return path
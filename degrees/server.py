@@ -0,0 +1,247 @@
+import asyncio
+import json
+import math
+import os
+import signal
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from batch import fork_context
+
+# How many recent latencies are kept for the percentiles in "stats"
+LATENCY_WINDOW = 1024
+
+
+class QueryStats():
+    """
+    Request counters exposed by the "stats" operation.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.requests = {}
+        self.errors = 0
+        self.in_flight = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.recent = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, op, latency, failed):
+        """
+        Counts one finished request that took `latency` seconds.
+        """
+        self.requests[op] = self.requests.get(op, 0) + 1
+        if failed:
+            self.errors += 1
+        self.latency_total += latency
+        self.latency_max = max(self.latency_max, latency)
+        self.recent.append(latency)
+
+    def snapshot(self):
+        """
+        Returns the counters as a JSON-serializable dictionary.
+        """
+        count = sum(self.requests.values())
+        recent = sorted(self.recent)
+        return {
+            "uptime": time.time() - self.started,
+            "requests": dict(self.requests),
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "latency": {
+                "mean": self.latency_total / count if count else 0.0,
+                "max": self.latency_max,
+                "p50": percentile(recent, 0.50),
+                "p99": percentile(recent, 0.99)
+            }
+        }
+
+
+class QueryServer():
+    """
+    Answers newline-delimited JSON requests such as
+    {"op": "path", "source": "Tom Hanks", "target": "Kevin Bacon"}
+    with one JSON response line each, over TCP or a Unix socket.
+
+    `handlers` maps an op name to a module-level function taking the
+    request dictionary and returning a response dictionary. Ops listed in
+    `background` are CPU-bound and run on a pool of forked worker
+    processes, which share the already loaded graph copy-on-write.
+
+    If `refresh` is given it is called every `refresh_interval` seconds on
+    a thread, so reading the changes does not hold up requests, and returns
+    None or a function applying what it read. That function runs on the
+    event loop, between requests, and returns whether the data changed.
+    `rebuild` works the same way for slow derived data, such as an index
+    the changes made stale, but does its work at most once every
+    `rebuild_interval` seconds. After every change a fresh pool is forked
+    from the updated process and the old one retires once its requests
+    finish. Failures are logged and the next interval tries again.
+    """
+
+    def __init__(self, handlers, background=(), workers=None, refresh=None, refresh_interval=5.0,
+                 rebuild=None, rebuild_interval=60.0):
+        self.handlers = handlers
+        self.background = set(background)
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = None
+        self.refresh = refresh
+        self.refresh_interval = refresh_interval
+        self.rebuild = rebuild
+        self.rebuild_interval = rebuild_interval
+        self.stats = QueryStats()
+
+    def start_workers(self):
+        """
+        Forks the worker processes before the event loop starts.
+        """
+        self.executor = ProcessPoolExecutor(self.workers, mp_context=fork_context())
+        self.executor.submit(int).result()
+
+    async def follow(self):
+        """
+        Calls `refresh` and `rebuild` periodically, replacing the workers
+        after every change.
+        """
+        rebuilt = -math.inf
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            changed = await self.update(self.refresh)
+            if self.rebuild is not None and time.monotonic() - rebuilt >= self.rebuild_interval:
+                started = time.monotonic()
+                if await self.update(self.rebuild):
+                    rebuilt = started
+                    changed = True
+            if changed:
+                retired = self.executor
+                self.start_workers()
+                retired.shutdown(wait=False)
+
+    async def update(self, read):
+        """
+        Runs `read` on a thread and the function it returns, if any, on the
+        event loop. Returns whether the data changed.
+        """
+        try:
+            apply = await asyncio.get_running_loop().run_in_executor(None, read)
+        except Exception as error:
+            print(f"Reading updates failed: {type(error).__name__}: {error}", file=sys.stderr)
+            return False
+        if apply is None:
+            return False
+        try:
+            return apply()
+        except Exception as error:
+            print(f"Applying updates failed: {type(error).__name__}: {error}", file=sys.stderr)
+            # Some of them may have been applied before the failure
+            return True
+
+    async def handle_connection(self, reader, writer):
+        """
+        Answers requests from one client until it disconnects.
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                response = await self.dispatch(line)
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, line):
+        """
+        Decodes one request line and returns its response dictionary.
+        """
+        started = time.perf_counter()
+        self.stats.in_flight += 1
+        op = "invalid"
+        try:
+            request = json.loads(line)
+            op = request.get("op")
+            if not isinstance(op, str):
+                message = f"\"op\" must be a string, not {json.dumps(op)}"
+                op = "invalid"
+                raise ValueError(message)
+            if op == "stats":
+                response = self.stats.snapshot()
+            elif op not in self.handlers:
+                response = {"error": f"unknown op {op!r}"}
+                op = "invalid"
+            elif op in self.background:
+                response = await self.run_in_worker(self.handlers[op], request)
+            else:
+                response = self.handlers[op](request)
+        except (ValueError, TypeError, AttributeError, KeyError) as error:
+            response = {"error": f"bad request: {error}"}
+        except Exception as error:
+            # A failing handler or a broken worker pool must still answer
+            # the client and count as an error, not drop the connection
+            response = {"error": f"internal error: {type(error).__name__}: {error}"}
+        finally:
+            self.stats.in_flight -= 1
+        self.stats.record(op, time.perf_counter() - started, "error" in response)
+        return response
+
+    async def run_in_worker(self, handler, request):
+        """
+        Runs `handler` on the process pool, tracking the queue depth.
+        """
+        stats = self.stats
+        stats.queue_depth += 1
+        stats.max_queue_depth = max(stats.max_queue_depth, stats.queue_depth)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, handler, request)
+        finally:
+            stats.queue_depth -= 1
+
+    async def serve(self, host="127.0.0.1", port=8765, path=None):
+        """
+        Listens on a Unix socket at `path` if given, else on TCP `host`:`port`,
+        until SIGINT or SIGTERM.
+        """
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle_connection, path=path)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        stop = asyncio.Event()
+        for signal_number in (signal.SIGINT, signal.SIGTERM):
+            asyncio.get_running_loop().add_signal_handler(signal_number, stop.set)
+        follower = asyncio.create_task(self.follow()) if self.refresh is not None else None
+        async with server:
+            await stop.wait()
+        if follower is not None:
+            follower.cancel()
+
+    def run(self, host="127.0.0.1", port=8765, path=None):
+        """
+        Starts the workers and serves until interrupted.
+        """
+        self.start_workers()
+        try:
+            asyncio.run(self.serve(host, port, path))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.executor.shutdown(cancel_futures=True)
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+
+
+def percentile(values, fraction):
+    """
+    Returns the `fraction` percentile of already sorted `values`.
+    """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
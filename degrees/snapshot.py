@@ -0,0 +1,162 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from graph import Graph
+from tail import checksum
+
+# Bump whenever the layout below changes so stale snapshots are rebuilt
+SNAPSHOT_VERSION = 5
+SNAPSHOT_MAGIC = b"DEGREES\0"
+SNAPSHOT_FILE = ".degrees.snapshot"
+SOURCE_FILES = ("people.csv", "movies.csv", "stars.csv")
+
+# Integer CSR and component sections followed by "\0"-joined UTF-8 string tables
+ARRAY_SECTIONS = (
+    "person_offsets", "person_movies", "person_movie_years", "movie_offsets", "movie_people", "component"
+)
+STRING_SECTIONS = ("person_ids", "person_names", "person_births", "movie_ids", "movie_titles", "movie_years")
+
+# Every CSR array is stored as native C ints, matching Graph
+ARRAY_TYPECODE = "i"
+ARRAY_ITEMSIZE = array(ARRAY_TYPECODE).itemsize
+
+# magic, version, header length
+PREAMBLE = struct.Struct("<8sII")
+
+
+def snapshot_path(directory):
+    """
+    Returns where the snapshot for a dataset directory is stored.
+    """
+    return os.path.join(directory, SNAPSHOT_FILE)
+
+
+def source_stamp(directory):
+    """
+    Returns the size and mtime of each CSV file the snapshot was built from.
+    """
+    stamp = {}
+    for filename in SOURCE_FILES:
+        stat = os.stat(os.path.join(directory, filename))
+        stamp[filename] = [stat.st_size, stat.st_mtime_ns]
+    return stamp
+
+
+def save_snapshot(graph, directory, stamp):
+    """
+    Writes a versioned binary snapshot of a freshly parsed `graph` for the
+    dataset in `directory`, whose CSV files had the given `stamp`.
+
+    The file is written next to its destination and renamed into place,
+    so concurrent readers never see a partial snapshot.
+    """
+    payloads = [(name, getattr(graph, name).tobytes()) for name in ARRAY_SECTIONS]
+    for name in STRING_SECTIONS:
+        payloads.append((name, "\0".join(getattr(graph, name)).encode("utf-8")))
+
+    # Section offsets are relative to the 8-byte aligned start of the data
+    sections = {}
+    offset = 0
+    for name, payload in payloads:
+        sections[name] = [offset, len(payload)]
+        offset += align(len(payload))
+    header = json.dumps({
+        "sources": stamp,
+        "checksums": {
+            filename: checksum(os.path.join(directory, filename), stamp[filename][0])
+            for filename in SOURCE_FILES
+        },
+        "byteorder": sys.byteorder,
+        "itemsize": ARRAY_ITEMSIZE,
+        "person_count": len(graph.person_ids),
+        "movie_count": len(graph.movie_ids),
+        "sections": sections
+    }).encode("utf-8")
+
+    path = snapshot_path(directory)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(PREAMBLE.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header)))
+        f.write(header)
+        f.write(bytes(align(PREAMBLE.size + len(header)) - PREAMBLE.size - len(header)))
+        for name, payload in payloads:
+            f.write(payload)
+            f.write(bytes(align(len(payload)) - len(payload)))
+    os.replace(temporary, path)
+
+
+def load_snapshot(directory):
+    """
+    Memory-maps the snapshot of the dataset in `directory` and returns a
+    Graph over it, whose `source_sizes` are the CSV sizes it covers.
+
+    Returns None if there is no snapshot, if it was written by another
+    version, or if a CSV file changed other than by appending rows since.
+    A snapshot is reused as is while every CSV keeps its size and mtime.
+    Rows appended after `source_sizes` are left for the caller to apply.
+    """
+    try:
+        with open(snapshot_path(directory), "rb") as f:
+            snapshot = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None
+
+    if len(snapshot) < PREAMBLE.size:
+        return None
+    magic, version, header_length = PREAMBLE.unpack(snapshot[:PREAMBLE.size])
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        return None
+    header = json.loads(snapshot[PREAMBLE.size:PREAMBLE.size + header_length])
+    if header["byteorder"] != sys.byteorder or header["itemsize"] != ARRAY_ITEMSIZE:
+        return None
+    if header["sources"] != source_stamp(directory) and not only_appended(directory, header):
+        return None
+
+    graph = Graph()
+    data = memoryview(snapshot)[align(PREAMBLE.size + header_length):]
+    for name in ARRAY_SECTIONS:
+        offset, length = header["sections"][name]
+        setattr(graph, name, data[offset:offset + length].cast(ARRAY_TYPECODE))
+
+    counts = {"person": header["person_count"], "movie": header["movie_count"]}
+    for name in STRING_SECTIONS:
+        offset, length = header["sections"][name]
+        count = counts[name.split("_")[0]]
+        setattr(graph, name, str(data[offset:offset + length], "utf-8").split("\0") if count else [])
+    graph.person_index = dict(zip(graph.person_ids, range(len(graph.person_ids))))
+    graph.movie_index = dict(zip(graph.movie_ids, range(len(graph.movie_ids))))
+    graph.source_sizes = {filename: header["sources"][filename][0] for filename in SOURCE_FILES}
+
+    # Keep the mapping alive for as long as the graph uses it
+    graph.snapshot = snapshot
+    return graph
+
+
+def only_appended(directory, header):
+    """
+    Returns whether every CSV file that changed since the snapshot in
+    `header` was built only grew: it has a new mtime, is larger, and still
+    starts with exactly the bytes the snapshot was built from. Any other
+    change, such as an edit that keeps the size, means a reparse.
+    """
+    stamp = source_stamp(directory)
+    for filename in SOURCE_FILES:
+        size, mtime = header["sources"][filename]
+        if stamp[filename] == [size, mtime]:
+            continue
+        if stamp[filename][0] <= size or stamp[filename][1] == mtime:
+            return False
+        if checksum(os.path.join(directory, filename), size) != header["checksums"][filename]:
+            return False
+    return True
+
+
+def align(size):
+    """
+    Rounds `size` up to a multiple of 8 bytes.
+    """
+    return (size + 7) & ~7
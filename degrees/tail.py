@@ -0,0 +1,81 @@
+import csv
+import io
+import os
+import zlib
+
+# Bytes read at a time when checksumming a file
+CHECKSUM_BLOCK = 1 << 20
+
+# Bytes before each file's offset compared on every poll, to notice a file
+# that was rewritten rather than appended to
+KNOWN_TAIL = 4096
+
+
+class CsvTail():
+    """
+    Follows rows appended to the people.csv, movies.csv and stars.csv files
+    of a dataset directory, starting from known byte offsets.
+    """
+
+    def __init__(self, directory, offsets):
+        self.directory = directory
+        # Bytes of each file already applied; only whole lines are consumed
+        self.offsets = dict(offsets)
+        self.fieldnames = {}
+        # The last bytes consumed from each file, which must not change
+        self.tails = {}
+        for filename, offset in self.offsets.items():
+            with open(os.path.join(directory, filename), "rb") as f:
+                f.seek(max(offset - KNOWN_TAIL, 0))
+                self.tails[filename] = f.read(offset - f.tell())
+
+    def poll(self):
+        """
+        Returns {filename: [row dictionaries]} for every complete line
+        appended since the last poll, and advances past them.
+
+        Returns None if a file is shorter than what was consumed or its last
+        consumed bytes changed: it was truncated or rewritten, so the rows
+        after the old offset may start mid-line and cannot be followed.
+        """
+        rows = {}
+        for filename, offset in self.offsets.items():
+            path = os.path.join(self.directory, filename)
+            tail = self.tails[filename]
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size < offset:
+                    return None
+                f.seek(offset - len(tail))
+                if f.read(len(tail)) != tail:
+                    return None
+                if filename not in self.fieldnames:
+                    f.seek(0)
+                    self.fieldnames[filename] = next(csv.reader([f.readline().decode("utf-8")]))
+                f.seek(offset)
+                data = f.read()
+            # A line still being written is left for the next poll
+            end = data.rfind(b"\n") + 1
+            if end == 0:
+                rows[filename] = []
+                continue
+            self.offsets[filename] = offset + end
+            self.tails[filename] = (tail + data[:end])[-KNOWN_TAIL:]
+            text = io.StringIO(data[:end].decode("utf-8"))
+            rows[filename] = list(csv.DictReader(text, fieldnames=self.fieldnames[filename]))
+        return rows
+
+
+def checksum(path, offset):
+    """
+    Returns a checksum of the first `offset` bytes of a file, used to tell
+    whether it was only appended to since the offset was recorded.
+    """
+    value = 0
+    with open(path, "rb") as f:
+        while offset > 0:
+            block = f.read(min(offset, CHECKSUM_BLOCK))
+            if not block:
+                break
+            value = zlib.crc32(block, value)
+            offset -= len(block)
+    return value
@@ -0,0 +1,203 @@
+import itertools
+
+GENES = (2, 1, 0)
+
+# A factor is a pair (variables, table): a tuple of person names, whose
+# gene counts are the variables, and a dictionary from every tuple of their
+# gene counts (in the same order) to a non-negative value
+
+
+def marginals(people, probs):
+    """
+    Return the gene and trait distribution of every person in `people`
+    (as loaded by `heredity.load_data`) given the known traits, computed
+    exactly with the model in `probs` (shaped like `heredity.PROBS`).
+
+    The pedigree is a Bayesian network over everyone's gene count, with
+    known traits as evidence on their holder's gene count. It is solved
+    with a junction tree built by variable elimination, so the cost grows
+    exponentially with the pedigree's treewidth (a few people for most
+    families) rather than with its size.
+    """
+    factors = [person_factor(people, person, probs) for person in people]
+    order = elimination_order(factors)
+    beliefs = junction_tree_beliefs(factors, order)
+
+    probabilities = {}
+    for person in people:
+        gene = {genes: beliefs[person][genes] for genes in GENES}
+        trait = people[person]["trait"]
+        if trait is None:
+            # An unobserved trait has no children, so it only depends on the gene count
+            has_trait = sum(gene[genes] * probs["trait"][genes][True] for genes in GENES)
+            trait = {True: has_trait, False: 1 - has_trait}
+        else:
+            trait = {True: float(trait), False: float(not trait)}
+        probabilities[person] = {"gene": gene, "trait": trait}
+    return probabilities
+
+
+def inheritance(genes, probs):
+    """
+    Return the probability that a parent with `genes` copies of the gene
+    passes one on to a child, mutations included.
+    """
+    if genes == 2:
+        return 1 - probs["mutation"]
+    if genes == 1:
+        return 0.5
+    return probs["mutation"]
+
+
+def person_factor(people, person, probs):
+    """
+    Return the factor of a person's gene count given their parents' (or
+    unconditionally, without parents), times the probability of their
+    trait if it is known.
+    """
+    trait = people[person]["trait"]
+    evidence = {genes: 1 if trait is None else probs["trait"][genes][trait] for genes in GENES}
+    parents = tuple(
+        parent for parent in (people[person]["mother"], people[person]["father"])
+        if parent is not None
+    )
+    if not parents:
+        return (person,), {(genes,): probs["gene"][genes] * evidence[genes] for genes in GENES}
+
+    table = {}
+    for parent_genes in itertools.product(GENES, repeat=len(parents)):
+        # A missing second parent passes the gene on only by mutation, as
+        # `heredity.joint_probability` treats them as having no copies
+        passed = [inheritance(genes, probs) for genes in parent_genes]
+        passed += [probs["mutation"]] * (2 - len(passed))
+        from_mother, from_father = passed
+        child = {
+            2: from_mother * from_father,
+            1: from_mother * (1 - from_father) + (1 - from_mother) * from_father,
+            0: (1 - from_mother) * (1 - from_father)
+        }
+        for genes in GENES:
+            table[parent_genes + (genes,)] = child[genes] * evidence[genes]
+    return parents + (person,), table
+
+
+def elimination_order(factors):
+    """
+    Return an order to eliminate every variable in `factors`, picking the
+    variable whose elimination adds the fewest new edges between its
+    neighbours (min-fill) each time, which keeps the cliques small.
+    """
+    neighbours = {}
+    for variables, _ in factors:
+        for variable in variables:
+            neighbours.setdefault(variable, set()).update(variables)
+    for variable in neighbours:
+        neighbours[variable].discard(variable)
+
+    def fill(variable):
+        around = list(neighbours[variable])
+        return sum(
+            1 for i, first in enumerate(around) for second in around[i + 1:]
+            if second not in neighbours[first]
+        )
+
+    scores = {variable: fill(variable) for variable in neighbours}
+    order = []
+    while scores:
+        variable = min(scores, key=scores.get)
+        order.append(variable)
+        around = neighbours.pop(variable)
+        del scores[variable]
+        for first in around:
+            neighbours[first].discard(variable)
+            neighbours[first].update(around - {first})
+        # Only the fill of the neighbours and their neighbours can change
+        for changed in set(around).union(*(neighbours[first] for first in around)):
+            scores[changed] = fill(changed)
+    return order
+
+
+def combine(factors, keep):
+    """
+    Return the factor over the variables `keep` obtained by multiplying
+    `factors` and summing out every other variable, scaled to sum to 1 so
+    long chains of messages do not underflow.
+    """
+    # A kept variable no factor mentions is free, as if in a factor of ones
+    variables = []
+    for factor_variables in [factor[0] for factor in factors] + [keep]:
+        for variable in factor_variables:
+            if variable not in variables:
+                variables.append(variable)
+    positions = [[variables.index(variable) for variable in factor[0]] for factor in factors]
+    kept = [variables.index(variable) for variable in keep]
+
+    table = {}
+    for values in itertools.product(GENES, repeat=len(variables)):
+        value = 1
+        for (_, factor_table), factor_positions in zip(factors, positions):
+            value *= factor_table[tuple(values[i] for i in factor_positions)]
+            if not value:
+                break
+        key = tuple(values[i] for i in kept)
+        table[key] = table.get(key, 0) + value
+
+    total = sum(table.values())
+    if total:
+        table = {key: value / total for key, value in table.items()}
+    return tuple(keep), table
+
+
+def junction_tree_beliefs(factors, order):
+    """
+    Return every variable's normalized distribution, as a dictionary of
+    variable -> {genes: probability}, given the product of `factors`.
+
+    Eliminating the variables in `order` forms one clique per variable:
+    the variables of the factors it is multiplied with. Each clique sends
+    its eliminated message to the clique that later uses it, which makes
+    the cliques a tree (a forest for unrelated families). Messages are
+    passed up that tree as in variable elimination, then back down, after
+    which each clique holds its variables' joint distribution.
+    """
+    position = {variable: step for step, variable in enumerate(order)}
+    # Each original factor belongs to the clique of its first eliminated variable
+    potentials = [[] for _ in order]
+    for factor in factors:
+        potentials[min(position[variable] for variable in factor[0])].append(factor)
+
+    parents = []
+    children = [[] for _ in order]
+    upward = []
+    # Messages waiting for the clique that uses them, as (clique that sent
+    # it, message); that is the clique of its first eliminated variable
+    waiting = [[] for _ in order]
+    for step, variable in enumerate(order):
+        incoming = waiting[step]
+        clique = set(itertools.chain.from_iterable(factor[0] for factor in potentials[step]))
+        for sender, message in incoming:
+            clique.update(message[0])
+            parents[sender] = step
+            children[step].append(sender)
+        parents.append(None)
+        separator = sorted(clique - {variable}, key=position.get)
+        message = combine(potentials[step] + [message for _, message in incoming], separator)
+        upward.append(message)
+        # A message over no variables ends an unrelated family
+        if separator:
+            waiting[position[separator[0]]].append((step, message))
+
+    # Downward pass, from the last cliques (the roots) back to the first
+    downward = [None] * len(order)
+    beliefs = {}
+    for step in reversed(range(len(order))):
+        incoming = [upward[child] for child in children[step]]
+        if parents[step] is not None:
+            incoming.append(downward[step])
+        for i, child in enumerate(children[step]):
+            # Everything the clique knows except what the child told it
+            others = incoming[:i] + incoming[i + 1:]
+            downward[child] = combine(potentials[step] + others, upward[child][0])
+        _, table = combine(potentials[step] + incoming, [order[step]])
+        beliefs[order[step]] = {values[0]: value for values, value in table.items()}
+    return beliefs
@@ -0,0 +1,212 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+
+import pagerank
+from graphfile import import_html, load_graph
+from linkgraph import LinkGraph
+from outofcore import corpus_adjacency, out_of_core_pagerank, write_edge_file
+from solvers import SOLVERS, solve
+
+# Reference ranks are iterated until their L1 change is below this, far
+# below the error of any method being measured
+REFERENCE_TOLERANCE = 1e-13
+
+
+def generate(directory, pages=1000, links=8, dangling=0.05, exponent=1.0, seed=0):
+    """
+    Writes a synthetic corpus of `pages` HTML files to `directory`.
+
+    Both degrees follow power laws: a page's number of links is Pareto
+    distributed with a mean of about `links`, and the page of popularity
+    rank r is linked to with weight 1 / (r + 1) ** exponent, so a few pages
+    have very many in-links. A `dangling` fraction of the pages has no
+    links at all. The same arguments always write the same files.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    names = [f"page{page}.html" for page in range(pages)]
+    # Popularity is shuffled so it does not follow the page numbers
+    popularity = list(range(pages))
+    rng.shuffle(popularity)
+    weights = list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(pages)))
+
+    for page, name in enumerate(names):
+        targets = set()
+        if pages > 1 and rng.random() >= dangling:
+            # A Pareto variate with shape 2 has a mean of 2
+            degree = min(pages - 1, max(1, round(links / 2 * rng.paretovariate(2))))
+            # Repeated draws of popular pages collapse, so a page with
+            # very many links may end up with somewhat fewer
+            for target in rng.choices(popularity, cum_weights=weights, k=2 * degree):
+                if target != page:
+                    targets.add(target)
+                    if len(targets) == degree:
+                        break
+        with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+            f.write(f"<!DOCTYPE html>\n<html>\n<head><title>{name}</title></head>\n<body>\n")
+            for target in sorted(targets):
+                f.write(f'<a href="{names[target]}">{names[target]}</a>\n')
+            f.write("</body>\n</html>\n")
+
+
+def timed(function, *args):
+    """
+    Returns the result of `function(*args)` and the seconds it took.
+    """
+    started = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - started
+
+
+def l1_error(ranks, reference):
+    """
+    Returns the L1 distance between a dictionary of ranks and the reference.
+    """
+    return sum(abs(ranks[page] - rank) for page, rank in reference.items())
+
+
+def commit():
+    """
+    Returns the git commit being benchmarked, or None outside a checkout.
+    """
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def benchmark_corpus(directory, damping_factor, samples, sample_tolerance, seed):
+    """
+    Times crawling `directory` and ranking it with every method, and
+    returns each method's seconds and L1 error against a high-precision
+    reference, as a JSON-serializable dictionary.
+    """
+    random.seed(seed)
+    crawl = {}
+    corpus, crawl["uncached_seconds"] = timed(pagerank.crawl, directory, None, False)
+    # The first cached crawl writes the cache
+    pagerank.crawl(directory)
+    _, crawl["cached_seconds"] = timed(pagerank.crawl, directory)
+
+    graph = LinkGraph.from_corpus(corpus)
+    reference, telemetry = solve(graph, damping_factor, "quadratic", REFERENCE_TOLERANCE, 100000)
+    reference = graph.to_dict(reference)
+
+    methods = {}
+    ranks, seconds = timed(pagerank.sample_pagerank, corpus, damping_factor, samples)
+    methods["sample"] = {"seconds": seconds, "l1_error": l1_error(ranks, reference), "samples": samples}
+    (ranks, margins, used), seconds = timed(
+        pagerank.adaptive_sample_pagerank, corpus, damping_factor, sample_tolerance
+    )
+    methods["adaptive_sample"] = {
+        "seconds": seconds, "l1_error": l1_error(ranks, reference), "samples": used,
+        "tolerance": sample_tolerance, "max_margin": max(margins.values())
+    }
+    (ranks, margins), seconds = timed(
+        pagerank.parallel_sample_pagerank, corpus, damping_factor, samples, 32, None, seed
+    )
+    methods["parallel_sample"] = {
+        "seconds": seconds, "l1_error": l1_error(ranks, reference), "samples": samples - samples % 32
+    }
+    ranks, seconds = timed(pagerank.iterate_pagerank, corpus, damping_factor)
+    methods["iterate"] = {"seconds": seconds, "l1_error": l1_error(ranks, reference)}
+    for method in SOLVERS:
+        (ranks, telemetry), seconds = timed(pagerank.solve_pagerank, corpus, damping_factor, method)
+        methods[f"solve_{method}"] = {
+            "seconds": seconds, "l1_error": l1_error(ranks, reference),
+            "iterations": telemetry["iterations"], "converged": telemetry["converged"]
+        }
+
+    with tempfile.TemporaryDirectory() as temporary:
+        # Graph files skip crawling entirely once written
+        path = os.path.join(temporary, "corpus.prgraph")
+        _, import_seconds = timed(import_html, directory, path)
+        loaded, load_seconds = timed(load_graph, path)
+        ranks, seconds = timed(pagerank.iterate_pagerank, loaded, damping_factor)
+        methods["graph_file_iterate"] = {
+            "seconds": seconds, "l1_error": l1_error(ranks, reference),
+            "import_seconds": import_seconds, "load_seconds": load_seconds
+        }
+
+        path = os.path.join(temporary, "corpus.edges")
+        pages, adjacency = corpus_adjacency(corpus)
+        _, write_seconds = timed(write_edge_file, path, len(pages), adjacency)
+        ranks, seconds = timed(out_of_core_pagerank, path, damping_factor)
+        methods["out_of_core"] = {
+            "seconds": seconds, "l1_error": l1_error(dict(zip(pages, ranks.tolist())), reference),
+            "write_seconds": write_seconds
+        }
+
+    return {
+        "directory": os.path.abspath(directory),
+        "pages": len(graph),
+        "links": len(graph.out_links),
+        "dangling": int(graph.dangling.sum()),
+        "crawl": crawl,
+        "methods": methods
+    }
+
+
+def run(directories, damping_factor=pagerank.DAMPING, samples=pagerank.SAMPLES, sample_tolerance=0.01, seed=0):
+    """
+    Benchmarks every corpus directory in `directories`, in order, and
+    returns the results as a JSON-serializable dictionary.
+    """
+    return {
+        "commit": commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "damping_factor": damping_factor,
+        "corpora": [
+            benchmark_corpus(directory, damping_factor, samples, sample_tolerance, seed)
+            for directory in directories
+        ]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pagerank on real or synthetic corpora.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    generator = commands.add_parser("generate", help="write a synthetic corpus")
+    generator.add_argument("directory")
+    generator.add_argument("--pages", type=int, default=1000)
+    generator.add_argument("--links", type=int, default=8, help="mean links per linking page (default: 8)")
+    generator.add_argument("--dangling", type=float, default=0.05,
+                           help="fraction of pages without links (default: 0.05)")
+    generator.add_argument("--exponent", type=float, default=1.0,
+                           help="power-law exponent of page popularity (default: 1.0)")
+    generator.add_argument("--seed", type=int, default=0)
+    runner = commands.add_parser("run", help="benchmark corpora and print the results as JSON")
+    runner.add_argument("directories", nargs="+", metavar="directory")
+    runner.add_argument("--damping", type=float, default=pagerank.DAMPING)
+    runner.add_argument("--samples", type=int, default=pagerank.SAMPLES, help="samples for the fixed-size samplers")
+    runner.add_argument("--tolerance", type=float, default=0.01, help="confidence half-width for adaptive sampling")
+    runner.add_argument("--seed", type=int, default=0)
+    runner.add_argument("--output", metavar="FILE", help="write the JSON here instead of stdout")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        generate(args.directory, args.pages, args.links, args.dangling, args.exponent, args.seed)
+        return
+
+    results = json.dumps(run(args.directories, args.damping, args.samples, args.tolerance, args.seed), indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(results + "\n")
+    else:
+        print(results)
+
+
+if __name__ == "__main__":
+    main()
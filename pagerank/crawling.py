@@ -0,0 +1,90 @@
+import json
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+CACHE_FILE = ".pagerank.cache"
+CACHE_VERSION = 1
+
+# Below this many files to parse, starting worker processes costs more than it saves
+PARALLEL_THRESHOLD = 64
+
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+
+def parse_links(path):
+    """
+    Returns the sorted list of distinct href targets in an HTML file.
+    """
+    with open(path) as f:
+        return sorted(set(LINK.findall(f.read())))
+
+
+def crawl_links(directory, workers=None, use_cache=True):
+    """
+    Returns a dictionary of every .html file in `directory` to the set of
+    href targets it contains, before any filtering.
+
+    Links are cached in `directory` by file name, size and mtime, so only
+    new or changed files are parsed again; those are parsed on a pool of
+    `workers` processes (one per core by default) when there are many.
+    """
+    cache_path = os.path.join(directory, CACHE_FILE)
+    cached = load_cache(cache_path) if use_cache else {}
+
+    stamps = {}
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".html") and entry.is_file():
+            stat = entry.stat()
+            stamps[entry.name] = [stat.st_size, stat.st_mtime_ns]
+    changed = [
+        filename for filename in stamps
+        if filename not in cached or cached[filename]["stamp"] != stamps[filename]
+    ]
+
+    paths = [os.path.join(directory, filename) for filename in changed]
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(paths) >= PARALLEL_THRESHOLD:
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(workers, mp_context=context) as executor:
+            parsed = list(executor.map(parse_links, paths, chunksize=max(1, len(paths) // (4 * workers))))
+    else:
+        parsed = [parse_links(path) for path in paths]
+
+    entries = {filename: cached[filename] for filename in stamps if filename not in changed}
+    for filename, links in zip(changed, parsed):
+        entries[filename] = {"stamp": stamps[filename], "links": links}
+    if use_cache and (changed or len(entries) != len(cached)):
+        try:
+            save_cache(cache_path, entries)
+        except OSError:
+            #A read-only corpus just means no cache
+            pass
+    return {filename: set(entries[filename]["links"]) for filename in stamps}
+
+
+def load_cache(path):
+    """
+    Returns the cached entries of a crawl cache file, or an empty
+    dictionary if it is missing, unreadable or from another version.
+    """
+    try:
+        with open(path, encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(cache, dict) or cache.get("version") != CACHE_VERSION:
+        return {}
+    return cache["files"]
+
+
+def save_cache(path, entries):
+    """
+    Writes crawl cache entries to `path`, renaming the finished file into
+    place so concurrent crawls never read a partial cache.
+    """
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump({"version": CACHE_VERSION, "files": entries}, f)
+    os.replace(temporary, path)
@@ -0,0 +1,165 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+from array import array
+
+import numpy as np
+
+from crawling import crawl_links
+from linkgraph import LinkGraph
+
+# Bump whenever the layout below changes so old files are rejected
+GRAPH_VERSION = 1
+GRAPH_MAGIC = b"PRGRAPH\0"
+
+# Both CSR indexes of a LinkGraph, then its "\0"-joined UTF-8 page names
+ARRAY_SECTIONS = {
+    "out_offsets": "<i8", "out_links": "<i4", "in_offsets": "<i8", "in_links": "<i4"
+}
+
+# magic, version, header length
+PREAMBLE = struct.Struct("<8sII")
+
+
+def save_graph(graph, path):
+    """
+    Writes a LinkGraph to a graph file at `path`, renaming the finished
+    file into place so readers never see a partial graph.
+    """
+    names = "\0".join(graph.pages)
+    if names.count("\0") != max(0, len(graph.pages) - 1):
+        raise ValueError("page names cannot contain NUL characters")
+    payloads = [
+        (name, np.ascontiguousarray(getattr(graph, name), dtype=dtype).tobytes())
+        for name, dtype in ARRAY_SECTIONS.items()
+    ]
+    payloads.append(("pages", names.encode("utf-8")))
+
+    # Section offsets are relative to the 8-byte aligned start of the data
+    sections = {}
+    offset = 0
+    for name, payload in payloads:
+        sections[name] = [offset, len(payload)]
+        offset += align(len(payload))
+    header = json.dumps({
+        "page_count": len(graph.pages),
+        "link_count": len(graph.out_links),
+        "sections": sections
+    }).encode("utf-8")
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(PREAMBLE.pack(GRAPH_MAGIC, GRAPH_VERSION, len(header)))
+        f.write(header)
+        f.write(bytes(align(PREAMBLE.size + len(header)) - PREAMBLE.size - len(header)))
+        for name, payload in payloads:
+            f.write(payload)
+            f.write(bytes(align(len(payload)) - len(payload)))
+    os.replace(temporary, path)
+
+
+def load_graph(path):
+    """
+    Memory-maps a graph file and returns a LinkGraph over it, which
+    `sample_pagerank`, `iterate_pagerank` and the other rankers in
+    pagerank.py accept in place of a corpus.
+
+    Nothing is parsed or sorted: the link arrays are views of the file,
+    read in by the operating system as they are used, and only the page
+    names are decoded.
+    """
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b""
+    if len(data) < PREAMBLE.size:
+        raise ValueError(f"{path} is not a graph file")
+    magic, version, header_length = PREAMBLE.unpack(data[:PREAMBLE.size])
+    if magic != GRAPH_MAGIC:
+        raise ValueError(f"{path} is not a graph file")
+    if version != GRAPH_VERSION:
+        raise ValueError(f"{path} is a version {version} graph file, expected version {GRAPH_VERSION}")
+    header = json.loads(data[PREAMBLE.size:PREAMBLE.size + header_length])
+    start = align(PREAMBLE.size + header_length)
+
+    arrays = {}
+    for name, dtype in ARRAY_SECTIONS.items():
+        offset, length = header["sections"][name]
+        arrays[name] = np.frombuffer(data, dtype=dtype, count=length // np.dtype(dtype).itemsize, offset=start + offset)
+    offset, length = header["sections"]["pages"]
+    pages = str(data[start + offset:start + offset + length], "utf-8").split("\0") if header["page_count"] else []
+    return LinkGraph.from_csr(pages, **arrays)
+
+
+def import_html(directory, path, workers=None):
+    """
+    Crawls a directory of HTML pages like `crawl` (ignoring self-links and
+    links to pages outside the directory) and writes its graph file.
+    """
+    links = crawl_links(directory, workers)
+    pages = list(links)
+    index = {page: i for i, page in enumerate(pages)}
+    sources = array("i")
+    targets = array("i")
+    for source, page in enumerate(pages):
+        linked = sorted(index[link] for link in links[page] if link in index and link != page)
+        sources.extend([source] * len(linked))
+        targets.extend(linked)
+    save_graph(LinkGraph(pages, sources, targets, index), path)
+
+
+def import_edge_list(edge_list, path):
+    """
+    Reads a text edge list, one "source target" pair of page names per
+    line (blank lines and lines starting with # are skipped), and writes
+    its graph file. Pages are numbered in order of first appearance;
+    repeated links and self-links are dropped, as `crawl` does.
+    """
+    index = {}
+    sources = array("i")
+    targets = array("i")
+    with open(edge_list, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            fields = line.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            if len(fields) != 2:
+                raise ValueError(f"{edge_list}:{number}: expected a source and a target page")
+            sources.append(index.setdefault(fields[0], len(index)))
+            targets.append(index.setdefault(fields[1], len(index)))
+
+    count = len(index)
+    sources = np.frombuffer(sources, dtype=np.int32).astype(np.int64)
+    targets = np.frombuffer(targets, dtype=np.int32).astype(np.int64)
+    # Sorting the links as source * count + target groups them by source
+    # and makes repeats adjacent for unique to drop
+    keys = np.unique((sources * count + targets)[sources != targets])
+    save_graph(LinkGraph(list(index), keys // count, keys % count, index), path)
+
+
+def align(size):
+    """
+    Rounds `size` up to a multiple of 8 bytes.
+    """
+    return (size + 7) & ~7
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert link graphs to graph files for pagerank.py.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    html = commands.add_parser("html", help="convert a directory of HTML pages")
+    html.add_argument("directory")
+    html.add_argument("output")
+    edges = commands.add_parser("edges", help="convert a text edge list of \"source target\" lines")
+    edges.add_argument("edge_list")
+    edges.add_argument("output")
+    args = parser.parse_args()
+
+    if args.command == "html":
+        import_html(args.directory, args.output)
+    else:
+        import_edge_list(args.edge_list, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+from collections import deque
+
+
+def changed_pages(old_corpus, new_corpus):
+    """
+    Returns the pages added, removed, or whose links differ between two corpora.
+    """
+    changed = set()
+    for page in old_corpus.keys() | new_corpus.keys():
+        old_links = old_corpus.get(page)
+        new_links = new_corpus.get(page)
+        # Link sets shared by a shallow copy of the corpus compare instantly
+        if old_links is not new_links and old_links != new_links:
+            changed.add(page)
+    return changed
+
+
+def push_update(old_corpus, old_ranks, new_corpus, damping_factor, tolerance=0.001, changed=None):
+    """
+    Returns the PageRank of every page of `new_corpus` by updating the
+    converged `old_ranks` of `old_corpus` around the `changed` pages
+    (found by comparing the corpora if not given), instead of iterating
+    from scratch.
+
+    The ranks, before normalizing, solve x = c + d * A x, where A follows
+    links and c is a constant: teleports and the rank of pages without
+    links are spread evenly over every page, so they only change the scale
+    of x. The old ranks are therefore an exact solution for the old links,
+    and the residual of the new equation is nonzero only at the pages
+    whose in-links changed and at new pages. Residuals are pushed along
+    links (Gauss-Southwell), each push settling one page's residual and
+    spreading `damping_factor` of it to the pages it links to, until the
+    total residual left bounds the L1 error of the ranks by `tolerance`.
+    """
+    if changed is None:
+        changed = changed_pages(old_corpus, new_corpus)
+
+    # Copying and then fixing up the few added and removed pages is much
+    # faster than building the dictionary page by page
+    ranks = dict(old_ranks)
+    added = [page for page in changed if page in new_corpus and page not in old_corpus]
+    for page in changed:
+        if page not in new_corpus:
+            ranks.pop(page, None)
+    for page in added:
+        ranks[page] = 0
+    if added:
+        dangling = sum(old_ranks[page] for page in old_corpus if not old_corpus[page])
+        constant = ((1 - damping_factor) + damping_factor * dangling) / len(old_corpus)
+
+    residuals = {}
+    for page in changed:
+        old_links = old_corpus.get(page)
+        if old_links:
+            share = damping_factor * old_ranks[page] / len(old_links)
+            for link in old_links:
+                residuals[link] = residuals.get(link, 0) - share
+        new_links = new_corpus.get(page)
+        if new_links:
+            share = damping_factor * ranks[page] / len(new_links)
+            for link in new_links:
+                residuals[link] = residuals.get(link, 0) + share
+    for page in added:
+        residuals[page] = residuals.get(page, 0) + constant
+    for page in list(residuals):
+        if page not in new_corpus:
+            del residuals[page]
+
+    # Leaving less than this at every page bounds the total residual, and
+    # with it the L1 error of the ranks, which sum to about 1
+    threshold = tolerance * (1 - damping_factor) / len(new_corpus)
+    queue = deque(page for page in residuals if abs(residuals[page]) > threshold)
+    queued = set(queue)
+    while queue:
+        page = queue.popleft()
+        queued.discard(page)
+        residual = residuals.pop(page)
+        ranks[page] += residual
+        links = new_corpus[page]
+        if not links:
+            continue
+        share = damping_factor * residual / len(links)
+        for link in links:
+            value = residuals.get(link, 0) + share
+            residuals[link] = value
+            if abs(value) > threshold and link not in queued:
+                queued.add(link)
+                queue.append(link)
+
+    scale = 1 / sum(ranks.values())
+    return dict(zip(ranks.keys(), map(scale.__mul__, ranks.values())))
@@ -0,0 +1,102 @@
+import itertools
+
+import numpy as np
+
+
+class LinkGraph():
+    """
+    A corpus as integer arrays. Pages are numbered in corpus order and
+    every link is stored twice in CSR form: by source page, for following
+    links, and by target page, for summing rank over in-links.
+
+    The links of page `p` are `out_links[out_offsets[p]:out_offsets[p + 1]]`
+    and the pages linking to it are `in_links[in_offsets[p]:in_offsets[p + 1]]`;
+    `in_targets` repeats each target once per in-link.
+    """
+
+    def __init__(self, pages, sources, targets, index=None):
+        self.pages = pages
+        self._index = index
+        count = len(pages)
+        sources = np.asarray(sources, dtype=np.int32)
+        targets = np.asarray(targets, dtype=np.int32)
+
+        self.out_degree = np.bincount(sources, minlength=count)
+        self.out_offsets = np.concatenate(([0], np.cumsum(self.out_degree)))
+        if np.all(sources[1:] >= sources[:-1]):
+            self.out_links = targets
+        else:
+            self.out_links = targets[np.argsort(sources, kind="stable")]
+
+        order = np.argsort(targets, kind="stable")
+        self.in_degree = np.bincount(targets, minlength=count)
+        self.in_offsets = np.concatenate(([0], np.cumsum(self.in_degree)))
+        self.in_links = sources[order]
+        self.in_targets = targets[order]
+
+        # Pages without links are treated as linking to every page
+        self.dangling = self.out_degree == 0
+
+    @classmethod
+    def from_corpus(cls, corpus):
+        """
+        Builds a LinkGraph from a `crawl` dictionary of page -> linked pages.
+        """
+        pages = list(corpus)
+        index = {page: i for i, page in enumerate(pages)}
+        counts = np.fromiter(map(len, corpus.values()), dtype=np.int64, count=len(pages))
+        # Links come out grouped by source page, in page order
+        sources = np.repeat(np.arange(len(pages), dtype=np.int32), counts)
+        links = itertools.chain.from_iterable(corpus.values())
+        targets = np.fromiter(map(index.__getitem__, links), dtype=np.int32, count=int(counts.sum()))
+        return cls(pages, sources, targets, index)
+
+    @classmethod
+    def from_csr(cls, pages, out_offsets, out_links, in_offsets, in_links):
+        """
+        Builds a LinkGraph from both of its CSR indexes, such as the arrays
+        of a graph file, without sorting any links.
+        """
+        graph = cls.__new__(cls)
+        graph.pages = pages
+        graph._index = None
+        graph.out_offsets = out_offsets
+        graph.out_links = out_links
+        graph.in_offsets = in_offsets
+        graph.in_links = in_links
+        graph.out_degree = np.diff(out_offsets)
+        graph.in_degree = np.diff(in_offsets)
+        graph.in_targets = np.repeat(np.arange(len(pages), dtype=np.int32), graph.in_degree)
+        graph.dangling = graph.out_degree == 0
+        return graph
+
+    @property
+    def index(self):
+        """
+        Dictionary of page name -> page number, built on first use.
+        """
+        if self._index is None:
+            self._index = {page: i for i, page in enumerate(self.pages)}
+        return self._index
+
+    def __len__(self):
+        return len(self.pages)
+
+    def teleport_matrix(self, seed_sets):
+        """
+        Returns a pages x sets array whose column k spreads a random jump
+        evenly over the pages in `seed_sets[k]`.
+        """
+        teleport = np.zeros((len(self.pages), len(seed_sets)))
+        for column, seeds in enumerate(seed_sets):
+            seeds = {self.index[page] for page in seeds}
+            if not seeds:
+                raise ValueError(f"seed set {column} is empty")
+            teleport[list(seeds), column] = 1 / len(seeds)
+        return teleport
+
+    def to_dict(self, ranks):
+        """
+        Returns a dictionary of page name -> rank for an array of ranks.
+        """
+        return dict(zip(self.pages, ranks.tolist()))
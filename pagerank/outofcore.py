@@ -0,0 +1,240 @@
+import argparse
+import itertools
+import os
+import struct
+
+import numpy as np
+
+from graphfile import load_graph
+
+# An edge file is this header (magic, page count, edge count), followed by
+# the edges as little-endian (source, target) uint32 pairs sorted by source
+MAGIC = b"PREDGES1"
+HEADER = struct.Struct("<8sQQ")
+EDGE = np.dtype([("source", "<u4"), ("target", "<u4")])
+
+# Edges read per chunk; each pass never holds more than this many in memory
+CHUNK_EDGES = 1 << 22
+
+
+def write_edge_file(path, count, adjacency):
+    """
+    Writes an edge file for `count` pages from `adjacency`, an iterable of
+    (source, targets) pairs in increasing source order, a chunk of edges at
+    a time, so the graph never has to be held in memory.
+    """
+    write_edge_chunks(path, count, adjacency_chunks(adjacency))
+
+
+def adjacency_chunks(adjacency):
+    """
+    Groups (source, targets) pairs into (sources, targets) arrays of about
+    CHUNK_EDGES edges each.
+    """
+    sources = []
+    targets = []
+    for source, linked in adjacency:
+        sources.extend([source] * len(linked))
+        targets.extend(linked)
+        if len(sources) >= CHUNK_EDGES:
+            yield np.array(sources, dtype=np.int64), np.array(targets, dtype=np.int64)
+            sources = []
+            targets = []
+    yield np.array(sources, dtype=np.int64), np.array(targets, dtype=np.int64)
+
+
+def write_edge_chunks(path, count, chunks):
+    """
+    Writes an edge file from `chunks`, an iterable of (sources, targets)
+    arrays whose sources never decrease, within and across chunks. If
+    `count` is None the page count is one more than the largest page
+    number seen. The file is written next to `path` and renamed into place.
+    """
+    edges = 0
+    previous = 0
+    largest = -1
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(HEADER.pack(MAGIC, count or 0, 0))
+            for sources, targets in chunks:
+                if not len(sources):
+                    continue
+                if sources[0] < previous or np.any(sources[1:] < sources[:-1]):
+                    raise ValueError("edges are not sorted by source page")
+                low = min(sources[0], targets.min())
+                high = max(sources[-1], targets.max())
+                if low < 0 or (count is not None and high >= count) or high >= 2 ** 32:
+                    raise ValueError(f"page number {low if low < 0 else high} out of range")
+                pairs = np.empty(len(sources), dtype=EDGE)
+                pairs["source"] = sources
+                pairs["target"] = targets
+                f.write(pairs.tobytes())
+                edges += len(sources)
+                previous = sources[-1]
+                largest = max(largest, high)
+            # The counts are only known once every edge is written
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, largest + 1 if count is None else count, edges))
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def convert_edge_list(edge_list, path, count=None):
+    """
+    Writes an edge file from a text edge list of "source target" page
+    numbers, one link per line and sorted by source page (as `sort -n`
+    leaves it), reading it a chunk at a time. Blank lines and lines
+    starting with # are skipped; any other line that is not two page
+    numbers raises a ValueError naming it. Pages are numbered from 0;
+    unless `count` is given, the largest number seen sets the page count.
+    """
+    def chunks():
+        with open(edge_list, encoding="utf-8") as f:
+            lines = enumerate(f, 1)
+            while True:
+                chunk = list(itertools.islice(lines, CHUNK_EDGES))
+                if not chunk:
+                    return
+                sources = []
+                targets = []
+                for number, line in chunk:
+                    fields = line.split()
+                    if not fields or fields[0].startswith("#"):
+                        continue
+                    if len(fields) != 2 or not (fields[0].isdigit() and fields[1].isdigit()):
+                        raise ValueError(f"{edge_list}:{number}: expected a source and a target page number")
+                    sources.append(int(fields[0]))
+                    targets.append(int(fields[1]))
+                yield np.array(sources, dtype=np.int64), np.array(targets, dtype=np.int64)
+
+    write_edge_chunks(path, count, chunks())
+
+
+def convert_graph_file(graph_path, path):
+    """
+    Writes an edge file from a graph file written by `graphfile.py`,
+    streaming its memory-mapped out-links a chunk at a time. Page numbers
+    follow the graph file's page table.
+    """
+    graph = load_graph(graph_path)
+    offsets = graph.out_offsets
+
+    def chunks():
+        first = 0
+        while first < len(graph):
+            # Whole pages, about CHUNK_EDGES links at a time
+            last = int(np.searchsorted(offsets, offsets[first] + CHUNK_EDGES, side="right")) - 1
+            last = min(len(graph), max(last, first + 1))
+            degrees = np.diff(offsets[first:last + 1])
+            sources = np.repeat(np.arange(first, last, dtype=np.int64), degrees)
+            yield sources, np.asarray(graph.out_links[offsets[first]:offsets[last]], dtype=np.int64)
+            first = last
+
+    write_edge_chunks(path, len(graph), chunks())
+
+
+def corpus_adjacency(corpus):
+    """
+    Returns the page list of a `crawl` corpus and an iterator of its
+    (source, targets) page numbers, for `write_edge_file`.
+    """
+    pages = list(corpus)
+    index = {page: i for i, page in enumerate(pages)}
+    adjacency = ((i, sorted(index[link] for link in corpus[page])) for i, page in enumerate(pages))
+    return pages, adjacency
+
+
+def open_edge_file(path):
+    """
+    Returns the page count of an edge file and its edges as a read-only
+    memory map, which the operating system pages in as chunks are read.
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        raise ValueError(f"{path} is not an edge file")
+    magic, count, edges = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not an edge file")
+    if not edges:
+        return count, np.zeros(0, dtype=EDGE)
+    return count, np.memmap(path, dtype=EDGE, mode="r", offset=HEADER.size, shape=(edges,))
+
+
+def out_of_core_pagerank(path, damping_factor, tolerance=1e-6, max_iterations=1000, chunk_edges=CHUNK_EDGES):
+    """
+    Returns the PageRank of every page of an edge file as an array, by power
+    iteration that streams the memory-mapped edges in chunks on every
+    iteration, until the L1 change in the ranks drops below `tolerance` or
+    after `max_iterations`. Pages without links link to every page.
+
+    Only per-page arrays (the ranks, their next values and the inverse
+    out-degrees) stay in memory, so the edges can be far larger than RAM.
+    """
+    count, edges = open_edge_file(path)
+    if not count:
+        return np.zeros(0)
+    # Summing a chunk's shares takes a page-sized array, so chunks at least
+    # as large as the page count keep that cost below the edges'
+    chunk_edges = max(chunk_edges, count)
+
+    # One streaming pass for the out-degrees
+    inverse_degree = np.zeros(count)
+    for first in range(0, len(edges), chunk_edges):
+        sources = edges["source"][first:first + chunk_edges]
+        inverse_degree += np.bincount(sources, minlength=count)
+    dangling = inverse_degree == 0
+    np.divide(1, inverse_degree, out=inverse_degree, where=~dangling)
+
+    ranks = np.full(count, 1 / count)
+    for iteration in range(max_iterations):
+        shares = ranks * inverse_degree
+        linked = np.zeros(count)
+        for first in range(0, len(edges), chunk_edges):
+            chunk = edges[first:first + chunk_edges]
+            linked += np.bincount(chunk["target"], weights=shares[chunk["source"]], minlength=count)
+        new_ranks = (1 - damping_factor) / count + damping_factor * (linked + ranks[dangling].sum() / count)
+        residual = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        if residual < tolerance:
+            break
+    return ranks / ranks.sum()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank graphs too large for memory from edge files.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    edges = commands.add_parser("edges", help="convert a text edge list of sorted \"source target\" page numbers")
+    edges.add_argument("edge_list")
+    edges.add_argument("output")
+    edges.add_argument("--pages", type=int, help="page count (default: largest page number + 1)")
+    graph = commands.add_parser("graph", help="convert a graph file written by graphfile.py")
+    graph.add_argument("graph_file")
+    graph.add_argument("output")
+    rank = commands.add_parser("rank", help="print the PageRank of every page of an edge file")
+    rank.add_argument("edge_file")
+    rank.add_argument("--damping", type=float, default=0.85)
+    rank.add_argument("--tolerance", type=float, default=1e-6, help="L1 change to stop at (default: 1e-6)")
+    rank.add_argument("--top", type=int, metavar="K", help="only print the K highest ranked pages")
+    args = parser.parse_args()
+
+    if args.command == "edges":
+        convert_edge_list(args.edge_list, args.output, args.pages)
+    elif args.command == "graph":
+        convert_graph_file(args.graph_file, args.output)
+    else:
+        ranks = out_of_core_pagerank(args.edge_file, args.damping, args.tolerance)
+        if args.top is None:
+            pages = range(len(ranks))
+        else:
+            pages = np.argsort(-ranks, kind="stable")[:args.top]
+        for page in pages:
+            print(f"{page}\t{ranks[page]:.8f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,59 @@
 #Alberto Pascal
 #CS50: Python AI Page Rank Algorithm.
 import os
-import random
-import re
 import sys
 
+from crawling import crawl_links
+from graphfile import load_graph
+from incremental import push_update
+from linkgraph import LinkGraph
+from sampling import adaptive_random_walk, parallel_random_walks, random_walk
+from solvers import personalized_power_iteration, power_iteration, solve
+
 DAMPING = 0.85
 SAMPLES = 10000
 
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
-    print(f"PageRank Results from Sampling (n = {SAMPLES})")
-    for page in sorted(ranks):
-        print(f"  {page}: {ranks[page]:.4f}")
+    if len(sys.argv) not in (2, 3):
+        sys.exit("Usage: python pagerank.py corpus|graphfile [walkers]")
+    #a graph file written by graphfile.py is loaded as is, a directory is crawled
+    if os.path.isfile(sys.argv[1]):
+        corpus = load_graph(sys.argv[1])
+    else:
+        corpus = crawl(sys.argv[1])
+    if len(sys.argv) == 3:
+        #many independent walkers across processes, with a 95% confidence interval per page
+        if not sys.argv[2].isdigit() or int(sys.argv[2]) < 1:
+            sys.exit("walkers must be a positive integer")
+        walkers = int(sys.argv[2])
+        ranks, margins = parallel_sample_pagerank(corpus, DAMPING, SAMPLES * walkers, walkers)
+        print(f"PageRank Results from Sampling ({walkers} walkers, n = {SAMPLES * walkers})")
+        for page in sorted(ranks):
+            print(f"  {page}: {ranks[page]:.4f} ± {margins[page]:.4f}")
+    else:
+        ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
+        print(f"PageRank Results from Sampling (n = {SAMPLES})")
+        for page in sorted(ranks):
+            print(f"  {page}: {ranks[page]:.4f}")
     ranks = iterate_pagerank(corpus, DAMPING)
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
 
 
-def crawl(directory):
+def crawl(directory, workers=None, use_cache=True):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
-    """
-    pages = dict()
 
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
+    The links found in each file are cached in the directory, so only new
+    or changed files are parsed again, in parallel when there are many.
+    """
+    pages = crawl_links(directory, workers, use_cache)
+    for filename in pages:
+        pages[filename] = pages[filename] - {filename}
 
     # Only include links to other pages in the corpus
     for filename in pages:
@@ -50,6 +65,16 @@ def crawl(directory):
     return pages
 
 
+def link_graph(corpus):
+    """
+    Return the LinkGraph of a corpus, or the corpus itself if it already
+    is one, such as a graph file loaded with `graphfile.load_graph`.
+    """
+    if isinstance(corpus, LinkGraph):
+        return corpus
+    return LinkGraph.from_corpus(corpus)
+
+
 def transition_model(corpus, page, damping_factor):
     """
     Return a probability distribution over which page to visit next,
@@ -64,6 +89,9 @@ def transition_model(corpus, page, damping_factor):
     
     #links that I can go to with a damping_factor probability. 
     page_links = corpus[page]
+    #a page without links is treated as linking to every page
+    if not page_links:
+        page_links = set(corpus)
 
     #pages that I could go to with a 1-damping_factor probability
     available_links = []
@@ -90,29 +118,69 @@ def sample_pagerank(corpus, damping_factor, n):
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    #get my list of pages
-    pages = list(corpus.keys())
-    #Prepare the dictionary containing the sample probabilities
-    created_pages = {}
-    #Generate a random first page from those available
-    first_page = random.choice(pages)
-    #for each page, set a starting probability of 0
-    for page in pages:
-        created_pages[page] = 0
-    #Update the probability of the first page I have drawn to 1/n because it is 1 appearance out of n samples
-    created_pages[first_page] = 1/n
-    #calculate the probabilities of going to other pages based on current page
-    current_probabilities = transition_model(corpus, first_page, damping_factor)
-    #sample over n-1 probabilities because I already had the first sample above    
-    for i in range(0,n-1):
-        #get a random new page based on the probabilities I had
-        new_page = random.choices(list(current_probabilities.keys()), list(current_probabilities.values()), k=1)
-        #add this page's appearance probability over my whole sample to the count
-        created_pages[new_page[0]] = created_pages[new_page[0]] + 1/n
-        #calculate the new probabilities
-        current_probabilities = transition_model(corpus,new_page[0],damping_factor)
-
-    return created_pages
+    #turn the corpus into link arrays once so every sample is a constant time draw instead of a new transition model
+    graph = link_graph(corpus)
+    visits = random_walk(graph, damping_factor, n)
+    #each appearance is 1/n of the whole sample
+    return {page: visits[i] / n for i, page in enumerate(graph.pages)}
+
+def parallel_sample_pagerank(corpus, damping_factor, n, walkers=32, workers=None, seed=None):
+    """
+    Return PageRank values for each page by sampling `n` pages split over
+    `walkers` independent random surfers, run in parallel on `workers`
+    processes (one per core by default).
+
+    Return two dictionaries keyed by page name: the estimated PageRank
+    values, which sum to 1, and the half-width of each value's 95%
+    confidence interval.
+    """
+    graph = link_graph(corpus)
+    ranks, margins = parallel_random_walks(graph, damping_factor, n, walkers, workers, seed)
+    return graph.to_dict(ranks), graph.to_dict(margins)
+
+
+def adaptive_sample_pagerank(corpus, damping_factor, tolerance=0.005, max_samples=10 ** 8):
+    """
+    Return PageRank values for each page by sampling pages until every
+    value is within `tolerance` of the true PageRank with 95% confidence
+    (or once `max_samples` pages, at most, were sampled), instead of a
+    fixed number.
+
+    Return the dictionary of estimated PageRank values, a dictionary of
+    the half-width of each value's 95% confidence interval, and the number
+    of samples used.
+    """
+    graph = link_graph(corpus)
+    ranks, margins, samples = adaptive_random_walk(graph, damping_factor, tolerance, max_samples)
+    return graph.to_dict(ranks), graph.to_dict(margins), samples
+
+
+def personalized_pagerank(corpus, damping_factor, seed_sets):
+    """
+    Return one PageRank dictionary per set of seed pages in `seed_sets`,
+    for a random surfer that jumps only to that set's pages instead of
+    to any page in the corpus.
+
+    All the rankings are computed together in one iteration over the
+    corpus, rather than once per seed set.
+    """
+    graph = link_graph(corpus)
+    ranks = personalized_power_iteration(graph, graph.teleport_matrix(seed_sets), damping_factor, 0.001)
+    return [graph.to_dict(ranks[:, column]) for column in range(len(seed_sets))]
+
+
+def update_pagerank(corpus, ranks, new_corpus, damping_factor, changed=None):
+    """
+    Return PageRank values for each page of `new_corpus`, an edited copy
+    of `corpus` whose PageRank values are `ranks`, without recomputing
+    them from the start.
+
+    Only the pages around the `changed` pages (the added, removed and
+    relinked pages; found by comparing both corpora if not given) are
+    updated, so small edits to large corpora are cheap.
+    """
+    return push_update(corpus, ranks, new_corpus, damping_factor, 0.001, changed)
+
 
 def iterate_pagerank(corpus, damping_factor):
     """
@@ -123,40 +191,26 @@ def iterate_pagerank(corpus, damping_factor):
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    
-    iteration_page_rank = {}
-    pages = list(corpus.keys())
-    #Define the starting page ranks for each page. 
-    for page in pages:
-        iteration_page_rank[page] = (1/len(corpus.keys()))
-    #prepare a flag to see when my values start to converge
-    finished_iterating = False
-    #I will now calculate iteratively my page rank values until I have a difference lower than 0.001 when compared to the previous iteration
-    while not finished_iterating:
-        previous_page_rank_values = iteration_page_rank.copy()
-        #assume I will finish in this iteration
-        finished_iterating = True
-        for page in pages:
-            #for each page, I calculate the new iteration_page_rank value calling the function
-            iteration_page_rank[page] = ((1-damping_factor)/len(corpus.keys())) + (damping_factor * sum_of_ranks(previous_page_rank_values, page, corpus))
-            if not abs(iteration_page_rank[page] - previous_page_rank_values[page])< 0.001:
-                #I need to keep iterating
-                finished_iterating = False
-    return iteration_page_rank
-
-def sum_of_ranks(prev_values, current_page, corpus):
-    """
-    This function calculates the sumation part of the page rank formula. 
-    """ 
-    prev_value_pages = prev_values.keys()
-    sum_of_values = 0
-   
-    for page in prev_value_pages:
-        if current_page in corpus[page]:
-            sum_of_values += prev_values[page]/len(corpus[page])
-        else:
-            continue
-    return sum_of_values
-        
+    #turn the corpus into link arrays once, then let numpy iterate over all pages at a time
+    graph = link_graph(corpus)
+    #keep iterating until no page changes by 0.001 or more, pages without links count as linking to every page
+    return graph.to_dict(power_iteration(graph, damping_factor, 0.001))
+
+def solve_pagerank(corpus, damping_factor, method="power", tolerance=1e-6, max_iterations=1000):
+    """
+    Return PageRank values for each page computed with one of the solvers
+    in `solvers.SOLVERS` ("power", "gauss-seidel", "aitken" or
+    "quadratic"), iterating until the L1 change in the values is below
+    `tolerance` or for at most `max_iterations` iterations.
+
+    Return the dictionary of PageRank values and a telemetry dictionary
+    with the iteration count, whether it converged, and the residual and
+    elapsed seconds after every iteration.
+    """
+    graph = link_graph(corpus)
+    ranks, telemetry = solve(graph, damping_factor, method, tolerance, max_iterations)
+    return graph.to_dict(ranks), telemetry
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,192 @@
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Steps each parallel walker takes before counting visits, so its random
+# start page does not bias the estimate (the start is forgotten at the
+# first teleport, and one happens every 1 / (1 - damping) steps or so)
+BURN_IN = 100
+
+# Two-sided 95% quantiles of Student's t distribution with 1 to 30 degrees
+# of freedom, and of the normal distribution it approaches beyond that
+T_95 = (
+    12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+    2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+    2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042
+)
+Z_95 = 1.959963984540054
+
+# Fewest batches an adaptive walk takes before trusting the spread of
+# their estimates, and the fewest steps per batch
+MIN_BATCHES = 10
+MIN_BATCH_SIZE = 1000
+
+# The LinkGraph being sampled by parallel walkers, inherited by the
+# forked worker processes instead of being sent to them
+walk_graph = None
+
+
+def random_walk(graph, damping_factor, n, rng=random, burn_in=0):
+    """
+    Walks a random surfer over a LinkGraph for `n` pages, starting at a
+    random page, and returns a list of how many times each page was visited.
+    The first `burn_in` steps are taken without being counted.
+
+    Every step is a two-stage draw in O(1): with probability
+    1 - `damping_factor`, or from a page without links, the surfer jumps to
+    a page chosen uniformly at random; otherwise it follows one of the
+    current page's links, also chosen uniformly. `rng` is the source of
+    randomness, the `random` module by default.
+    """
+    # Plain lists index much faster than numpy arrays one item at a time
+    offsets = graph.out_offsets.tolist()
+    links = graph.out_links.tolist()
+    visits = [0] * len(graph)
+    page = rng.randrange(len(graph))
+    page = walk_steps(offsets, links, None, page, burn_in, damping_factor, rng.random)
+    walk_steps(offsets, links, visits, page, n, damping_factor, rng.random)
+    return visits
+
+
+def walk_steps(offsets, links, visits, page, steps, damping_factor, uniform):
+    """
+    Takes `steps` steps of a random walk from `page` over the out-link
+    lists `offsets` and `links`, adding one to `visits` for each page
+    visited (unless it is None), and returns the page the walk is on next.
+    """
+    count = len(offsets) - 1
+    for step in range(steps):
+        if visits is not None:
+            visits[page] += 1
+        first = offsets[page]
+        degree = offsets[page + 1] - first
+        if degree and uniform() < damping_factor:
+            page = links[first + int(uniform() * degree)]
+        else:
+            page = int(uniform() * count)
+    return page
+
+
+def adaptive_random_walk(graph, damping_factor, tolerance, max_samples=10 ** 8, rng=random):
+    """
+    Walks a random surfer over a LinkGraph until every page's estimated
+    PageRank is within `tolerance` of its true value with 95% confidence,
+    or for at most `max_samples` pages, and returns three values: an array of the
+    estimated ranks, an array of the half-widths of their 95% confidence
+    intervals, and the number of samples taken. Raises ValueError if
+    `max_samples` is below 2, as the spread needs at least two batches.
+
+    The walk is one chain cut into equal batches, each batch's visit shares
+    being a nearly independent estimate (batch means), so the standard
+    error of a rank is the spread of its batch estimates. Since pages a
+    short walk never visits would have no spread, the error is never taken
+    below what independent samples would give.
+    """
+    if max_samples < 2:
+        raise ValueError(f"need at least 2 samples, not {max_samples}")
+    count = len(graph)
+    offsets = graph.out_offsets.tolist()
+    links = graph.out_links.tolist()
+    # Updating the totals is O(pages) per batch, so batches are at least that
+    # long, unless two of them would not fit in `max_samples`
+    batch = min(max(MIN_BATCH_SIZE, count), max_samples // 2)
+    visits = np.zeros(count, dtype=np.int64)
+    squares = np.zeros(count, dtype=np.int64)
+    page = rng.randrange(count)
+    page = walk_steps(offsets, links, None, page, BURN_IN, damping_factor, rng.random)
+    batches = 0
+    while True:
+        counts = [0] * count
+        page = walk_steps(offsets, links, counts, page, batch, damping_factor, rng.random)
+        counts = np.array(counts, dtype=np.int64)
+        visits += counts
+        squares += counts ** 2
+        batches += 1
+        samples = batches * batch
+        # Whether another whole batch still fits in `max_samples`
+        room = samples + batch <= max_samples
+        if batches < 2 or batches < MIN_BATCHES and room:
+            continue
+
+        ranks = visits / samples
+        # Squared totals can pass the int64 range on long walks
+        variance = np.maximum(squares - visits.astype(np.float64) ** 2 / batches, 0) / (batches - 1) / batch ** 2
+        floor = np.maximum(ranks, 1 / samples) * (1 - ranks) / samples
+        error = np.sqrt(np.maximum(variance / batches, floor))
+        margins = (T_95[batches - 2] if batches - 1 <= len(T_95) else Z_95) * error
+        if margins.max() < tolerance or not room:
+            return ranks, margins, samples
+
+
+def parallel_random_walks(graph, damping_factor, n, walkers=32, workers=None, seed=None):
+    """
+    Splits `n` samples evenly over `walkers` independent random walks with
+    separate seeds, run on a pool of forked processes, and returns two
+    arrays: each page's estimated PageRank and the half-width of its 95%
+    confidence interval. If `n` is not a multiple of `walkers`, the
+    remainder is not sampled. Raises ValueError if there are no walkers or
+    fewer samples than walkers.
+
+    Each walker's visit shares are an independent estimate of the ranks,
+    so the interval is a Student's t interval over their spread across
+    walkers. Walks are
+    reproducible for a given `seed`, whatever the number of `workers`.
+    """
+    global walk_graph
+    if walkers < 1:
+        raise ValueError(f"need at least one walker, not {walkers}")
+    if n < walkers:
+        raise ValueError(f"cannot split {n} samples over {walkers} walkers")
+    if seed is None:
+        seed = random.randrange(2 ** 63)
+    workers = min(workers or os.cpu_count() or 1, walkers)
+    samples = n // walkers
+    # Worker i runs every workers-th walker starting at walker i
+    groups = [[f"{seed}:{walker}" for walker in range(first, walkers, workers)] for first in range(workers)]
+    walk_graph = graph
+    try:
+        if workers == 1:
+            totals = [walk_group(damping_factor, samples, groups[0])]
+        else:
+            context = multiprocessing.get_context("fork")
+            with ProcessPoolExecutor(workers, mp_context=context) as executor:
+                totals = list(executor.map(walk_group, [damping_factor] * workers, [samples] * workers, groups))
+    finally:
+        walk_graph = None
+
+    # Integer totals make the result independent of how walkers were grouped
+    visits = sum(total[0] for total in totals)
+    squares = sum(total[1] for total in totals)
+    ranks = visits / (walkers * samples)
+    if walkers < 2:
+        return ranks, np.full(len(graph), np.inf)
+    # Squared totals can pass the int64 range once a page has billions of visits
+    variance = (squares - visits.astype(np.float64) ** 2 / walkers) / (walkers - 1) / samples ** 2
+    quantile = T_95[walkers - 2] if walkers - 1 <= len(T_95) else Z_95
+    return ranks, quantile * np.sqrt(np.maximum(variance, 0) / walkers)
+
+
+def walk_group(damping_factor, samples, seeds):
+    """
+    Runs one random walk of `samples` pages over `walk_graph` per seed in a
+    worker, and returns the sum of their visit counts and of their squares
+    per page.
+    """
+    count = len(walk_graph)
+    # Converted once per worker rather than once per walk, as in random_walk
+    offsets = walk_graph.out_offsets.tolist()
+    links = walk_graph.out_links.tolist()
+    visits = np.zeros(count, dtype=np.int64)
+    squares = np.zeros(count, dtype=np.int64)
+    for seed in seeds:
+        rng = random.Random(seed)
+        counts = [0] * count
+        page = walk_steps(offsets, links, None, rng.randrange(count), BURN_IN, damping_factor, rng.random)
+        walk_steps(offsets, links, counts, page, samples, damping_factor, rng.random)
+        counts = np.array(counts, dtype=np.int64)
+        visits += counts
+        squares += counts ** 2
+    return visits, squares
@@ -0,0 +1,214 @@
+import time
+from collections import deque
+
+import numpy as np
+
+SOLVERS = ("power", "gauss-seidel", "aitken", "quadratic")
+
+# Page blocks updated in turn by a Gauss-Seidel sweep, each one already
+# seeing the new ranks of the blocks before it
+GAUSS_SEIDEL_BLOCKS = 64
+
+# Power iterations between two extrapolations
+EXTRAPOLATION_PERIOD = 10
+
+# Memory allowed for the per-link rank shares of a block of personalized
+# rank vectors; larger batches are iterated a block of columns at a time
+BLOCK_BYTES = 1 << 28
+
+
+def power_iteration(graph, damping_factor, tolerance=0.001):
+    """
+    Returns the PageRank of every page of a LinkGraph as an array, by
+    power iteration until no page's rank changes by `tolerance` or more.
+
+    Each iteration costs O(pages + links): every page splits its rank
+    over its links, the shares are summed per target through the in-link
+    index, and the rank of dangling pages is spread over all pages.
+    """
+    ranks = np.full(len(graph), 1 / len(graph))
+    inverse_degree = inverse_degrees(graph)
+    while True:
+        new_ranks = power_step(graph, ranks, damping_factor, inverse_degree)
+        converged = np.abs(new_ranks - ranks).max() < tolerance
+        ranks = new_ranks
+        if converged:
+            return ranks
+
+
+def inverse_degrees(graph):
+    """
+    Returns 1 / out-degree for every page of a LinkGraph, and 0 for pages
+    without links, which have no links to split their rank over.
+    """
+    inverse_degree = np.zeros(len(graph))
+    np.divide(1, graph.out_degree, out=inverse_degree, where=~graph.dangling)
+    return inverse_degree
+
+
+def power_step(graph, ranks, damping_factor, inverse_degree):
+    """
+    Returns the ranks after one power iteration from `ranks`.
+    """
+    count = len(graph)
+    shares = (ranks * inverse_degree)[graph.in_links]
+    linked = np.bincount(graph.in_targets, weights=shares, minlength=count)
+    dangling = ranks[graph.dangling].sum()
+    return (1 - damping_factor) / count + damping_factor * (linked + dangling / count)
+
+
+def gauss_seidel_sweep(graph, ranks, damping_factor, inverse_degree, blocks):
+    """
+    Returns the ranks after one block Gauss-Seidel sweep from `ranks`:
+    the pages in each (start, end) range of `blocks` are updated together,
+    using the ranks already updated earlier in the sweep.
+
+    A sweep does not preserve the total rank, and the error in the total
+    would only shrink by `damping_factor` per sweep, so the ranks are
+    normalized after each one.
+    """
+    count = len(graph)
+    ranks = ranks.copy()
+    dangling = ranks[graph.dangling].sum()
+    for start, end in blocks:
+        first = graph.in_offsets[start]
+        last = graph.in_offsets[end]
+        sources = graph.in_links[first:last]
+        shares = ranks[sources] * inverse_degree[sources]
+        linked = np.bincount(graph.in_targets[first:last] - start, weights=shares, minlength=end - start)
+        new_ranks = (1 - damping_factor) / count + damping_factor * (linked + dangling / count)
+        dangling += (new_ranks - ranks[start:end])[graph.dangling[start:end]].sum()
+        ranks[start:end] = new_ranks
+    return ranks / ranks.sum()
+
+
+def aitken_extrapolation(older, old, current):
+    """
+    Returns the Aitken delta-squared extrapolation of three successive
+    power iterates, page by page. A page's rank is only extrapolated
+    while its successive changes shrink geometrically (their ratio is
+    between -1 and 1); other pages keep their current rank.
+    """
+    previous_change = old - older
+    change = current - old
+    ratio = np.zeros_like(change)
+    np.divide(change, previous_change, out=ratio, where=previous_change != 0)
+    ratio[np.abs(ratio) >= 1] = 0
+    return current + change * ratio / (1 - ratio)
+
+
+def quadratic_extrapolation(oldest, older, old, current):
+    """
+    Returns the quadratic extrapolation of four successive power iterates
+    (Kamvar et al.), which removes the two next-largest eigenvector
+    components from the current iterate by a least-squares fit.
+    """
+    differences = np.column_stack((older - oldest, old - oldest))
+    gamma = np.linalg.lstsq(differences, -(current - oldest), rcond=None)[0]
+    gamma_1, gamma_2, gamma_3 = gamma[0], gamma[1], 1
+    return (gamma_1 + gamma_2 + gamma_3) * older + (gamma_2 + gamma_3) * old + gamma_3 * current
+
+
+def solve(graph, damping_factor, method="power", tolerance=1e-6, max_iterations=1000):
+    """
+    Returns the PageRank of every page of a LinkGraph as an array, and a
+    telemetry dictionary, using one of the `SOLVERS`:
+
+    * "power": plain power iteration,
+    * "gauss-seidel": block Gauss-Seidel sweeps, which use each page's new
+      rank as soon as its block is updated,
+    * "aitken" and "quadratic": power iteration with an Aitken or
+      quadratic extrapolation every EXTRAPOLATION_PERIOD iterations.
+
+    Iteration stops when the L1 norm of the change in the ranks drops
+    below `tolerance`, or after `max_iterations`. The telemetry holds the
+    method, the iteration count, whether it converged, and the L1 residual
+    and elapsed seconds after every iteration.
+    """
+    if method not in SOLVERS:
+        raise ValueError(f"unknown solver {method!r}, expected one of {', '.join(SOLVERS)}")
+    started = time.perf_counter()
+    count = len(graph)
+    inverse_degree = inverse_degrees(graph)
+    bounds = np.linspace(0, count, min(count, GAUSS_SEIDEL_BLOCKS) + 1).astype(int)
+    blocks = list(zip(bounds[:-1], bounds[1:]))
+    telemetry = {"method": method, "iterations": 0, "converged": False, "residuals": [], "seconds": []}
+
+    ranks = np.full(count, 1 / count)
+    # Successive plain power iterates, for extrapolation
+    iterates = deque(maxlen=4)
+    for iteration in range(1, max_iterations + 1):
+        if method == "gauss-seidel":
+            new_ranks = gauss_seidel_sweep(graph, ranks, damping_factor, inverse_degree, blocks)
+        else:
+            new_ranks = power_step(graph, ranks, damping_factor, inverse_degree)
+            iterates.append(new_ranks)
+            if method != "power" and iteration % EXTRAPOLATION_PERIOD == 0 and len(iterates) == 4:
+                if method == "aitken":
+                    candidate = aitken_extrapolation(iterates[-3], iterates[-2], iterates[-1])
+                else:
+                    candidate = quadratic_extrapolation(*iterates)
+                # Extrapolation can overshoot, so it is kept a distribution
+                # and only used if a power step from it changes less than
+                # the last plain one did
+                candidate = np.maximum(candidate, 0)
+                candidate /= candidate.sum()
+                stepped = power_step(graph, candidate, damping_factor, inverse_degree)
+                change = np.abs(stepped - candidate).sum()
+                if change < np.abs(iterates[-1] - iterates[-2]).sum():
+                    ranks = candidate
+                    new_ranks = stepped
+                iterates.clear()
+                iterates.append(new_ranks)
+        residual = float(np.abs(new_ranks - ranks).sum())
+        ranks = new_ranks
+        telemetry["iterations"] = iteration
+        telemetry["residuals"].append(residual)
+        telemetry["seconds"].append(time.perf_counter() - started)
+        if residual < tolerance:
+            telemetry["converged"] = True
+            break
+    return ranks / ranks.sum(), telemetry
+
+
+def personalized_power_iteration(graph, teleport, damping_factor, tolerance=0.001):
+    """
+    Returns a pages x vectors array whose column k holds the PageRank of
+    every page of a LinkGraph when the random surfer teleports according
+    to column k of `teleport` (each column summing to 1) instead of
+    uniformly. Pages without links still link to every page.
+
+    All columns are iterated together as one block against the shared
+    in-link index, and each stops being updated once no page's rank in it
+    changes by `tolerance` or more.
+    """
+    teleport = np.asarray(teleport, dtype=np.float64)
+    count, vectors = teleport.shape
+    # Rank vectors are kept as rows, so each one is contiguous
+    ranks = np.full((vectors, count), 1 / count)
+    teleport = np.ascontiguousarray(teleport.T)
+    inverse_degree = inverse_degrees(graph)
+    dangling_pages = np.flatnonzero(graph.dangling)
+    links = max(1, len(graph.in_links))
+    # Shares and their targets take 16 bytes per link and rank vector
+    block = max(1, min(vectors, BLOCK_BYTES // (16 * links)))
+    # The in-link targets of row i of a block are offset by i pages, so one
+    # bincount sums every row's shares at once
+    targets = (graph.in_targets + (np.arange(block) * count)[:, None]).ravel()
+
+    active = np.arange(vectors)
+    while len(active):
+        unconverged = []
+        for first in range(0, len(active), block):
+            rows = active[first:first + block]
+            current = ranks[rows]
+            shares = np.take(current * inverse_degree, graph.in_links, axis=1)
+            size = len(rows) * count
+            linked = np.bincount(targets[:shares.size], weights=shares.ravel(), minlength=size)
+            linked = linked.reshape(len(rows), count)
+            dangling = np.take(current, dangling_pages, axis=1).sum(axis=1, keepdims=True)
+            new_ranks = (1 - damping_factor) * teleport[rows] + damping_factor * (linked + dangling / count)
+            unconverged.append(rows[np.abs(new_ranks - current).max(axis=1) >= tolerance])
+            ranks[rows] = new_ranks
+        active = np.concatenate(unconverged)
+    return np.ascontiguousarray(ranks.T)